@@ -0,0 +1,102 @@
+import numpy as np
+
+from ConnectState import ConnectState, H1, BOARD_MASK, DIRECTIONS
+from meta import GameMeta
+from playout import evaluate
+
+ONE = GameMeta.PLAYERS['one']
+TWO = GameMeta.PLAYERS['two']
+# Value of each outcome code for player one, as in MCTS.evaluate
+OUTCOME_VALUES = np.zeros(len(GameMeta.OUTCOMES))
+OUTCOME_VALUES[GameMeta.OUTCOMES['one']] = 1.0
+OUTCOME_VALUES[GameMeta.OUTCOMES['draw']] = 0.5
+
+
+def has_four(bitboards):
+    # Vectorized version of ConnectState.has_four over an array of uint64 bitboards
+    found = np.zeros(bitboards.shape, dtype=bool)
+    for shift in DIRECTIONS:
+        shift = np.uint64(shift)
+        pairs = bitboards & (bitboards >> shift)
+        found |= (pairs & (pairs >> (shift + shift))) != 0
+    return found
+
+
+class BatchConnectState:
+    # N boards stored as arrays of bitboards (same layout as ConnectState, which fits in 49 bits)
+    def __init__(self, n):
+        self.n = n
+        self.pieces = np.zeros((len(GameMeta.PLAYERS), n), dtype=np.uint64)
+        self.mask = np.zeros(n, dtype=np.uint64)
+        self.to_play = np.full(n, ONE, dtype=np.int8)
+        self.counts = np.zeros((n, GameMeta.COLS), dtype=np.int8)  # Pieces already in each column
+
+    @classmethod
+    def from_state(cls, state: ConnectState, n):
+        batch = cls(n)
+        batch.pieces[ONE] = state.pieces[ONE]
+        batch.pieces[TWO] = state.pieces[TWO]
+        batch.mask[:] = state.mask
+        batch.to_play[:] = state.to_play
+        batch.counts[:] = [GameMeta.ROWS - 1 - h for h in state.height]
+        return batch
+
+    def move(self, cols):
+        # Plays cols[i] on board i; boards with a negative column are left untouched
+        cols = np.asarray(cols)
+        boards = np.flatnonzero(cols >= 0)
+        cols = cols[boards]
+        players = self.to_play[boards]
+        bits = np.uint64(1) << (cols * H1 + self.counts[boards, cols]).astype(np.uint64)
+        self.pieces[players, boards] |= bits
+        self.mask[boards] |= bits
+        self.counts[boards, cols] += 1
+        self.to_play[boards] = np.where(players == ONE, TWO, ONE)
+
+    def legal_mask(self):
+        return self.counts < GameMeta.ROWS
+
+    def check_win(self):
+        winner = np.zeros(self.n, dtype=np.int8)
+        winner[has_four(self.pieces[ONE])] = ONE
+        winner[has_four(self.pieces[TWO])] = TWO
+        return winner
+
+    def game_over(self):
+        return (self.check_win() != 0) | (self.mask == np.uint64(BOARD_MASK))
+
+    def outcomes(self):
+        # Same mapping as ConnectState.get_outcome, board by board
+        winner = self.check_win()
+        outcomes = np.where(winner == ONE, GameMeta.OUTCOMES['one'], GameMeta.OUTCOMES['two'])
+        outcomes[(winner == 0) & (self.mask == np.uint64(BOARD_MASK))] = GameMeta.OUTCOMES['draw']
+        return outcomes
+
+
+def random_playouts(state: ConnectState, n, max_depth=8, rng=None, evaluator=evaluate):
+    # n uniform random playouts from state with the semantics of WeakMCTS.roll_out: stop at game
+    # over or after max_depth plies and report the value for player one in [0, 1], exact for
+    # finished games and evaluator(board) for the boards cut off by max_depth
+    if rng is None:
+        rng = np.random.default_rng()
+    batch = BatchConnectState.from_state(state, n)
+    played = []
+    for _ in range(max_depth):
+        over = batch.game_over()
+        if over.all():
+            break
+        scores = np.where(batch.legal_mask(), rng.random((n, GameMeta.COLS)), -1.0)
+        cols = scores.argmax(axis=1)
+        cols[over] = -1
+        batch.move(cols)
+        played.append(cols)
+
+    values = OUTCOME_VALUES[batch.outcomes()]
+    # Truncated boards are rebuilt as ConnectState (replaying their moves) for the evaluator
+    for i in np.flatnonzero(~batch.game_over()):
+        board = state.clone()
+        for cols in played:
+            if cols[i] >= 0:
+                board.move(int(cols[i]))
+        values[i] = evaluator(board)
+    return values
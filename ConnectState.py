@@ -1,64 +1,192 @@
+import random
+
 from meta import GameMeta
 
 
+# Bitboard layout: every column takes ROWS + 1 bits (the extra bit is a sentinel
+# that keeps shifted lines from wrapping into the next column). Bit
+# col * H1 + r is the cell of column col, r rows above the bottom.
+H1 = GameMeta.ROWS + 1
+BOTTOM_MASK = [1 << (col * H1) for col in range(GameMeta.COLS)]
+TOP_MASK = [1 << (col * H1 + GameMeta.ROWS - 1) for col in range(GameMeta.COLS)]
+COLUMN_MASK = [((1 << GameMeta.ROWS) - 1) << (col * H1) for col in range(GameMeta.COLS)]
+BOARD_MASK = sum(COLUMN_MASK)
+BOTTOM_ROW = sum(BOTTOM_MASK)
+TOP_ROW = sum(TOP_MASK)
+DIRECTIONS = (1, H1, H1 - 1, H1 + 1)  # vertical, horizontal, both diagonals
+
+
+# Zobrist keys, one 64-bit random number per (player, bit). Filled in place so
+# modules that imported the table see a reseed.
+ZOBRIST = [[0] * (GameMeta.COLS * H1) for _ in GameMeta.PLAYERS]
+
+
+def init_zobrist(seed=GameMeta.ZOBRIST_SEED):
+    rng = random.Random(seed)
+    for keys in ZOBRIST:
+        for i in range(len(keys)):
+            keys[i] = rng.getrandbits(64)
+
+
+init_zobrist()
+
+
+# Legal columns for every combination of full columns, indexed by mask & TOP_ROW
+LEGAL_MOVES = {
+    sum(TOP_MASK[col] for col in range(GameMeta.COLS) if full >> col & 1):
+        tuple(col for col in range(GameMeta.COLS) if not full >> col & 1)
+    for full in range(1 << GameMeta.COLS)
+}
+
+
+def cell_index(row, col):
+    # Converts a (row, col) matrix position (row 0 is the top) into its bitboard bit index
+    return col * H1 + GameMeta.ROWS - 1 - row
+
+
+def cell_bit(row, col):
+    return 1 << cell_index(row, col)
+
+
+def mirror(bitboard):
+    # Left-right reflection of a bitboard: column col trades places with column COLS - 1 - col
+    column = (1 << H1) - 1
+    result = 0
+    for col in range(GameMeta.COLS):
+        result |= ((bitboard >> (col * H1)) & column) << ((GameMeta.COLS - 1 - col) * H1)
+    return result
+
+
+def has_four(bitboard):
+    # Shift-and-AND: two rounds per direction leave a bit set only where 4 pieces line up
+    for shift in DIRECTIONS:
+        pairs = bitboard & (bitboard >> shift)
+        if pairs & (pairs >> (2 * shift)):
+            return True
+    return False
+
+
 class ConnectState:
     def __init__(self):
-        self.board = [[0] * GameMeta.COLS for _ in range(GameMeta.ROWS)]
+        self.pieces = [0, 0, 0]  # One bitboard per player, indexed by the player number
+        self.mask = 0  # Every occupied cell
         self.to_play = GameMeta.PLAYERS['one']
         self.height = [GameMeta.ROWS - 1] * GameMeta.COLS
         self.last_played = []
+        self.moves = []  # Move stack, lets the search take moves back in place
+        self.hash = 0  # Zobrist key of the pieces on the board, updated on every move/undo
+
+    @property
+    def board(self):
+        # Matrix view of the bitboards, kept for printing and dataset generation
+        return [[self.cell(row, col) for col in range(GameMeta.COLS)] for row in range(GameMeta.ROWS)]
+
+    def cell(self, row, col):
+        bit = cell_bit(row, col)
+        if self.pieces[GameMeta.PLAYERS['one']] & bit:
+            return GameMeta.PLAYERS['one']
+        if self.pieces[GameMeta.PLAYERS['two']] & bit:
+            return GameMeta.PLAYERS['two']
+        return GameMeta.PLAYERS['none']
 
     def get_board(self):
-        return [row[:] for row in self.board]
+        return self.board
 
     def move(self, col):
-        self.board[self.height[col]][col] = self.to_play
-        self.last_played = [self.height[col], col]
-        self.height[col] -= 1
-        self.to_play = GameMeta.PLAYERS['two'] if self.to_play == GameMeta.PLAYERS['one'] else GameMeta.PLAYERS['one']
+        row = self.height[col]
+        index = col * H1 + GameMeta.ROWS - 1 - row  # cell_index(row, col), inlined: this runs on every ply
+        bit = 1 << index
+        player = self.to_play
+        self.pieces[player] |= bit
+        self.mask |= bit
+        self.hash ^= ZOBRIST[player][index]
+        self.last_played = [row, col]
+        self.height[col] = row - 1
+        self.moves.append(col)
+        self.to_play = 3 - player
+
+    def hash_after(self, col):
+        #Hash of the position after playing col, without playing it
+        return self.hash ^ ZOBRIST[self.to_play][cell_index(self.height[col], col)]
+
+    def undo(self):
+        #Takes back the last move and gives the turn back to whoever played it
+        col = self.moves.pop()
+        self.height[col] += 1
+        index = cell_index(self.height[col], col)
+        bit = 1 << index
+        player = GameMeta.PLAYERS['one'] if self.pieces[GameMeta.PLAYERS['one']] & bit else GameMeta.PLAYERS['two']
+        self.pieces[player] ^= bit
+        self.mask ^= bit
+        self.hash ^= ZOBRIST[player][index]
+        self.to_play = player
+        self.last_played = [self.height[self.moves[-1]] + 1, self.moves[-1]] if self.moves else []
+        return col
+
+    def key(self):
+        # Exact position key (49 bits, never 0): the sentinel bit on top of every column marks its
+        # height and the bits below it hold the pieces of the player to move
+        return self.pieces[self.to_play] + self.mask + BOTTOM_ROW
+
+    def canonical_key(self):
+        # Smallest key between the position and its mirror image, and whether it came from the mirror
+        key = self.key()
+        mirrored = mirror(key)
+        return (mirrored, True) if mirrored < key else (key, False)
+
+    def unmake(self, col):
+        if not self.moves or self.moves[-1] != col:
+            raise ValueError(f"Column {col} is not the last move played")
+        return self.undo()
 
     def get_legal_moves(self):
-        return [col for col in range(GameMeta.COLS) if self.board[0][col] == 0]
+        return list(LEGAL_MOVES[self.mask & TOP_ROW])
+
+    def playable(self):
+        # Adding the bottom row to the mask carries into the lowest free cell of every column
+        return (self.mask + BOTTOM_ROW) & BOARD_MASK
+
+    def threats(self, player):
+        #Bitboard of the empty cells (playable now or not) that would complete four for player
+        p = self.pieces[player]
+        cells = (p << 1) & (p << 2) & (p << 3)
+        for shift in DIRECTIONS[1:]:
+            pairs = (p << shift) & (p << 2 * shift)
+            cells |= pairs & (p << 3 * shift)
+            cells |= pairs & (p >> shift)
+            pairs = (p >> shift) & (p >> 2 * shift)
+            cells |= pairs & (p << shift)
+            cells |= pairs & (p >> 3 * shift)
+        return cells & (BOARD_MASK ^ self.mask)
+
+    def winning_moves(self, player):
+        #Columns where player wins immediately by dropping a piece
+        wins = self.threats(player) & self.playable()
+        if not wins:
+            return []
+        return [col for col in range(GameMeta.COLS) if wins & COLUMN_MASK[col]]
 
     def check_win(self):
-        if len(self.last_played) > 0 and self.check_win_from(self.last_played[0], self.last_played[1]):
-            return self.board[self.last_played[0]][self.last_played[1]]
+        # Only the player who just moved (the one not to play) can have completed four
+        if self.last_played:
+            player = 3 - self.to_play
+            if has_four(self.pieces[player]):
+                return player
         return 0
 
     def check_win_from(self, row, col):
-        player = self.board[row][col]
-        directions = [(1, 0), (0, 1), (1, 1), (1, -1)]  #Tuples (dr, dc) for navigating the matrix. Moves a row, column, upwards diagonal and downwards diagonal.
-
-        for dr, dc in directions:
-            count = 1 #Starts the count with the piece placed
-
-            # Checks direction dr, dc
-            r, c = row + dr, col + dc
-            while 0 <= r < GameMeta.ROWS and 0 <= c < GameMeta.COLS and self.board[r][c] == player: #Verifies if the current spot is occupied by the same player who just played. Stops if the spot is empty or occupied by the enemy piece
-                count += 1
-                r += dr
-                c += dc
-
-            # Checks opposite direction (goes backwards)
-            r, c = row - dr, col - dc
-            while 0 <= r < GameMeta.ROWS and 0 <= c < GameMeta.COLS and self.board[r][c] == player:
-                count += 1
-                r -= dr
-                c -= dc
-
-            if count >= 4: #Condition for win, 4 or more pieces in a row. Can be easily changed to modify the game
-                return True
-
-        return False
+        player = self.cell(row, col)
+        return player != GameMeta.PLAYERS['none'] and has_four(self.pieces[player])
 
     def game_over(self):
-        return self.check_win() or len(self.get_legal_moves()) == 0
+        return self.check_win() or self.mask == BOARD_MASK
 
     def get_outcome(self):
-        if len(self.get_legal_moves()) == 0 and self.check_win() == 0:
+        winner = self.check_win()
+        if self.mask == BOARD_MASK and winner == 0:
             return GameMeta.OUTCOMES['draw']
 
-        return GameMeta.OUTCOMES['one'] if self.check_win() == GameMeta.PLAYERS['one'] else GameMeta.OUTCOMES['two']
+        return GameMeta.OUTCOMES['one'] if winner == GameMeta.PLAYERS['one'] else GameMeta.OUTCOMES['two']
 
     def print(self):
         #Draws the board
@@ -66,9 +194,10 @@ class ConnectState:
 
         for row in range(GameMeta.ROWS):
             for col in range(GameMeta.COLS):
-                print('|{} '.format('🔵' if self.board[row][col] == 1 else '🔴' if self.board[row][col] == 2 else '  '), end='') #Checks every spot for a player chip and displays the correct board
+                cell = self.cell(row, col)
+                print('|{} '.format('🔵' if cell == 1 else '🔴' if cell == 2 else '  '), end='') #Checks every spot for a player chip and displays the correct board
             print('|')
-        
+
         print('=============================')
         print('  1 | 2 | 3 | 4 | 5 | 6 | 7  ')
 
@@ -81,16 +210,19 @@ class ConnectState:
         for row in self.board:
             features.extend(row)
         #proximo jogador
-        features.append(self.to_play) 
+        features.append(self.to_play)
         #altura da coluna de circulos
         features.extend([GameMeta.ROWS - 1 - h for h in self.height])
         return features
-    
+
     # Adicionar este método à classe ConnectState:
     def clone(self):
-        new_state = ConnectState()
-        new_state.board = [row[:] for row in self.board]
+        new_state = ConnectState.__new__(ConnectState)
+        new_state.pieces = self.pieces[:]
+        new_state.mask = self.mask
         new_state.to_play = self.to_play
         new_state.height = self.height[:]
         new_state.last_played = self.last_played[:]
+        new_state.moves = self.moves[:]
+        new_state.hash = self.hash
         return new_state
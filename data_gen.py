@@ -1,85 +1,187 @@
 import csv
+import json
+import multiprocessing
 import os
 import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from ConnectState import ConnectState
 from mcts import MCTS, WeakMCTS
+from meta import BookMeta, CacheMeta
+from opening_book import load_book
+from position_cache import PositionCache
 from random_ai import RandomAI
 
+HEADER = [f'cell_{i}' for i in range(42)] + ['to_play'] + ['label']
+
+# Estado de cada processo do pool, preenchido por _init_worker
+_worker = {}
+
 def flatten_board(board):
     return [cell for row in board for cell in row]
 
-def generate_training_data(num_games, output_file, strong_time=1, weak_time=0.2):
-    file_exists = os.path.isfile(output_file)
-    strong_wins = 0
-    losses = 0
-    draws = 0
-
-    with open(output_file, 'a', newline='') as file:
-        writer = csv.writer(file)
-        if not file_exists:
-            # Escreve o cabeçalho apenas se o arquivo for novo
-            writer.writerow([f'cell_{i}' for i in range(42)] + ['to_play'] + ['label'])
-
-        for game_num in range(num_games):
-            print(f"[{time.strftime('%H:%M:%S')}] Iniciando jogo {game_num + 1}...")
-            state = ConnectState()
-
-            # Alterna quem será o MCTS forte
-            mcts_player = 1 if game_num % 2 == 0 else 2
-            strong_mcts = MCTS(state)
-            weak_mcts = WeakMCTS(state)
-            # random_ai = RandomAI(state)
-
-            while not state.game_over():
-                current_player = state.to_play
-
-                if current_player == mcts_player:
-                    strong_mcts.search(strong_time)
-                    move = strong_mcts.best_move()
-                    board_flat = flatten_board(state.board)
-                    writer.writerow(board_flat + [current_player] + [move])
-                else:
-                    weak_mcts.search(weak_time)
-                    move = weak_mcts.best_move()
-                    # move = random_ai.best_move()
-
-                # Aplica a jogada no jogo e sincroniza ambos os AIs
-                state.move(move)
-                strong_mcts.move(move)
-                weak_mcts.move(move)
-
-            # Verifica se o strong venceu
-            outcome = state.get_outcome()
-            if outcome == 3:
-                draws += 1
-            elif (mcts_player == 1 and outcome == 1) or (mcts_player == 2 and outcome == 2):
-                strong_wins += 1
-            else:
-                losses += 1  # <- agora precisa declarar losses antes também
-
-    total_games = num_games
-    losses = total_games - strong_wins - draws
-    winrate = (strong_wins / total_games) * 100
-    drawrate = (draws / total_games) * 100
-    lossrate = (losses / total_games) * 100
+def shard_dir(output_file):
+    return f"{os.path.splitext(output_file)[0]}_shards"
+
+def load_manifest(path):
+    if os.path.isfile(path):
+        with open(path) as f:
+            return json.load(f)
+    return None
+
+def save_manifest(manifest, path):
+    # Escreve num ficheiro temporário e troca: um crash nunca deixa o manifesto a meio
+    with open(path + '.tmp', 'w') as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(path + '.tmp', path)
+
+def _init_worker(counter, directory, cache_file, book_file):
+    # Cada processo escreve no seu próprio shard; só o primeiro escreve na cache de posições
+    with counter.get_lock():
+        index = counter.value
+        counter.value += 1
+    _worker['shard'] = f"shard_{index}.csv"
+    _worker['path'] = os.path.join(directory, _worker['shard'])
+    _worker['cache'] = PositionCache(cache_file, writable=index == 0) if cache_file else None
+    _worker['book'] = load_book(book_file)
+
+def _play_game(game_num, strong_time, weak_time):
+    # Um jogo MCTS vs WeakMCTS; as linhas do jogo vão para o shard do processo de uma só vez
+    state = ConnectState()
+    lookups_before = _lookups()
+
+    # Alterna quem será o MCTS forte
+    mcts_player = 1 if game_num % 2 == 0 else 2
+    strong_mcts = MCTS(state, cache=_worker['cache'], book=_worker['book'])
+    weak_mcts = WeakMCTS(state)
+    # random_ai = RandomAI(state)
+    rows = []
+
+    while not state.game_over():
+        current_player = state.to_play
+
+        if current_player == mcts_player:
+            strong_mcts.search(strong_time)
+            move = strong_mcts.best_move()
+            board_flat = flatten_board(state.board)
+            rows.append(board_flat + [current_player] + [move])
+        else:
+            weak_mcts.search(weak_time)
+            move = weak_mcts.best_move()
+            # move = random_ai.best_move()
+
+        # Aplica a jogada no jogo e sincroniza ambos os AIs
+        state.move(move)
+        strong_mcts.move(move)
+        weak_mcts.move(move)
+
+    with open(_worker['path'], 'a', newline='') as file:
+        csv.writer(file).writerows(rows)
+        file.flush()
+        os.fsync(file.fileno())
+        size = file.tell()
+
+    # Verifica se o strong venceu
+    outcome = state.get_outcome()
+    if outcome == 3:
+        result = 'draws'
+    elif outcome == mcts_player:
+        result = 'wins'
+    else:
+        result = 'losses'
+    lookups = {name: count - lookups_before[name] for name, count in _lookups().items()}
+    return game_num, result, _worker['shard'], size, lookups
+
+def _lookups():
+    # Acertos e falhas do livro e da cache neste processo
+    counts = {}
+    for name in ('book', 'cache'):
+        source = _worker[name]
+        counts[f'{name}_hits'] = source.hits if source is not None else 0
+        counts[f'{name}_misses'] = source.misses if source is not None else 0
+    return counts
+
+def generate_training_data(num_games, output_file, strong_time=1, weak_time=0.2, workers=None,
+                           cache_file=CacheMeta.PATH, book_file=BookMeta.PATH):
+    # Joga num_games jogos em paralelo, um shard CSV por processo em <output>_shards/. O manifesto
+    # guarda os jogos terminados, o tamanho válido de cada shard e as estatísticas, por isso
+    # correr de novo com o mesmo output_file continua onde a corrida anterior parou.
+    directory = shard_dir(output_file)
+    manifest_path = os.path.join(directory, 'manifest.json')
+    os.makedirs(directory, exist_ok=True)
+
+    manifest = load_manifest(manifest_path) or {
+        'num_games': num_games, 'strong_time': strong_time, 'weak_time': weak_time,
+        'completed': [], 'shards': {}, 'stats': {'wins': 0, 'draws': 0, 'losses': 0},
+        'lookups': {'book_hits': 0, 'book_misses': 0, 'cache_hits': 0, 'cache_misses': 0},
+    }
+    manifest['num_games'] = max(manifest['num_games'], num_games)
+
+    # Linhas escritas depois do último checkpoint pertencem a jogos que vão ser repetidos
+    for name in os.listdir(directory):
+        if name.startswith('shard_'):
+            with open(os.path.join(directory, name), 'r+b') as f:
+                f.truncate(manifest['shards'].get(name, 0))
+    save_manifest(manifest, manifest_path)
+
+    done = set(manifest['completed'])
+    pending = [game_num for game_num in range(manifest['num_games']) if game_num not in done]
+    if done:
+        print(f"[{time.strftime('%H:%M:%S')}] A retomar: {len(done)} jogos feitos, {len(pending)} por jogar")
+
+    if cache_file:
+        PositionCache(cache_file, writable=True).close()  # Cria o ficheiro antes de os leitores o abrirem
+    counter = multiprocessing.Value('i', 0)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(counter, directory, cache_file, book_file)) as pool:
+        futures = [pool.submit(_play_game, game_num, strong_time, weak_time) for game_num in pending]
+        for future in as_completed(futures):
+            game_num, result, shard, size, lookups = future.result()
+            manifest['completed'].append(game_num)
+            manifest['shards'][shard] = size
+            manifest['stats'][result] += 1
+            for name, count in lookups.items():
+                manifest['lookups'][name] += count
+            save_manifest(manifest, manifest_path)
+            print(f"[{time.strftime('%H:%M:%S')}] Jogo {game_num + 1} terminado "
+                  f"({len(manifest['completed'])}/{manifest['num_games']})")
+
+    merge_shards(output_file)
+    stats = manifest['stats']
+    total_games = len(manifest['completed'])
+    winrate = (stats['wins'] / total_games) * 100
+    drawrate = (stats['draws'] / total_games) * 100
+    lossrate = (stats['losses'] / total_games) * 100
 
     result_text = (
-        f"Strong MCTS Stats (último bloco de {total_games} jogos):\n"
-        f"- Vitórias: {strong_wins} ({winrate:.2f}%)\n"
-        f"- Empates: {draws} ({drawrate:.2f}%)\n"
-        f"- Derrotas: {losses} ({lossrate:.2f}%)\n"
+        f"Strong MCTS Stats ({total_games} jogos):\n"
+        f"- Vitórias: {stats['wins']} ({winrate:.2f}%)\n"
+        f"- Empates: {stats['draws']} ({drawrate:.2f}%)\n"
+        f"- Derrotas: {stats['losses']} ({lossrate:.2f}%)\n"
     )
 
     # Salva os resultados em um arquivo de texto separado
     stats_filename = f"{os.path.splitext(output_file)[0]}_results.txt"
-    with open(stats_filename, 'a') as f:
+    with open(stats_filename, 'w') as f:
         f.write(result_text)
 
     print(f"Treinamento salvo em {output_file}")
     print(result_text.strip())
     print(f"Resumo salvo em {stats_filename}")
+    lookups = manifest['lookups']
+    for name, label in (('book', 'Livro de aberturas'), ('cache', 'Cache de posições')):
+        total = lookups[f'{name}_hits'] + lookups[f'{name}_misses']
+        if total:
+            print(f"{label}: {lookups[name + '_hits']} acertos ({lookups[name + '_hits'] / total * 100:.1f}%)")
+
+def merge_shards(output_file):
+    # Junta os shards (até ao tamanho registado no manifesto) num único CSV com cabeçalho
+    directory = shard_dir(output_file)
+    manifest = load_manifest(os.path.join(directory, 'manifest.json'))
+    with open(output_file, 'w', newline='') as out:
+        csv.writer(out).writerow(HEADER)
+        for shard, size in sorted(manifest['shards'].items()):
+            with open(os.path.join(directory, shard), newline='') as f:
+                out.write(f.read(size))
 
-#rodar indefinidamente por blocos
 if __name__ == "__main__":
-    while True:
-        generate_training_data(num_games=100, output_file="training_data9.csv", strong_time=2, weak_time=0.5)
\ No newline at end of file
+    generate_training_data(num_games=1000, output_file="training_data10.csv", strong_time=2, weak_time=0.5)
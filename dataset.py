@@ -0,0 +1,132 @@
+import csv
+import glob
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+from meta import DatasetMeta
+
+FORMAT = 'connect4-dataset'
+VERSION = 1
+
+
+def header_path(path):
+    # Cabeçalho (esquema e proveniência) ao lado dos dados: training_data9.npy -> training_data9.json
+    return f"{os.path.splitext(path)[0]}.json"
+
+
+def read_header(path):
+    with open(header_path(path)) as f:
+        header = json.load(f)
+    if header.get('format') != FORMAT or header.get('version') != VERSION:
+        raise ValueError(f"{path} is not a dataset (version {VERSION})")
+    return header
+
+
+def load_dataset(path, mmap=True):
+    # Matriz int8 (linhas x colunas) mapeada em memória: nada é lido do disco até ser usado
+    header = read_header(path)
+    data = np.load(path, mmap_mode='r' if mmap else None)
+    if list(data.shape) != [header['rows'], len(header['columns'])]:
+        raise ValueError(f"{path} does not match its header")
+    return data, header
+
+
+def iter_chunks(path, chunk_rows=DatasetMeta.CHUNK_ROWS):
+    # Blocos de até chunk_rows linhas (int8) de um CSV ou de um .npy, sem carregar o ficheiro inteiro
+    if path.endswith('.npy'):
+        data, _ = load_dataset(path)
+        for start in range(0, len(data), chunk_rows):
+            yield np.asarray(data[start:start + chunk_rows])
+        return
+
+    with open(path, newline='') as f:
+        reader = csv.reader(f)
+        next(reader)
+        chunk = []
+        for row in reader:
+            if row:
+                chunk.append(row)
+            if len(chunk) == chunk_rows:
+                yield _to_int8(chunk, path)
+                chunk = []
+        if chunk:
+            yield _to_int8(chunk, path)
+
+
+def convert_csv(csv_path, npy_path=None, chunk_rows=DatasetMeta.CHUNK_ROWS, columns=None):
+    # Converte um CSV de inteiros pequenos (com cabeçalho) num .npy int8 e no respetivo cabeçalho.
+    # O CSV é lido em blocos de chunk_rows linhas e escrito num ficheiro temporário, que só passa a
+    # npy_path depois de o cabeçalho estar escrito. A largura vem das linhas de dados; columns dá os
+    # nomes quando o cabeçalho do CSV não corresponde às linhas.
+    npy_path = npy_path or f"{os.path.splitext(csv_path)[0]}.npy"
+    with open(csv_path, newline='') as f:
+        reader = csv.reader(f)
+        names = next(reader)
+        rows = 0
+        width = None
+        for row in reader:
+            if not row:
+                continue
+            if width is None:
+                width = len(row)
+            elif len(row) != width:
+                raise ValueError(f"{csv_path}: row {rows + 1} has {len(row)} columns, expected {width}")
+            rows += 1
+
+    columns = list(columns or names)
+    if width is not None and len(columns) != width:
+        raise ValueError(f"{csv_path}: the header names {len(columns)} columns but the rows have {width}")
+
+    npy_tmp = f"{npy_path}.tmp"
+    json_tmp = f"{header_path(npy_path)}.tmp"
+    try:
+        data = np.lib.format.open_memmap(npy_tmp, mode='w+', dtype=np.int8, shape=(rows, len(columns)))
+        start = 0
+        for chunk in iter_chunks(csv_path, chunk_rows):
+            data[start:start + len(chunk)] = chunk
+            start += len(chunk)
+        data.flush()
+        del data
+
+        header = {
+            'format': FORMAT,
+            'version': VERSION,
+            'dtype': 'int8',
+            'rows': rows,
+            'columns': columns,
+            'source': os.path.basename(csv_path),
+            'source_bytes': os.path.getsize(csv_path),
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        }
+        with open(json_tmp, 'w') as f:
+            json.dump(header, f, indent=1)
+        os.replace(json_tmp, header_path(npy_path))
+        os.replace(npy_tmp, npy_path)
+    finally:
+        for path in (npy_tmp, json_tmp):
+            if os.path.exists(path):
+                os.remove(path)
+    return npy_path
+
+
+def _to_int8(chunk, path):
+    values = np.array(chunk, dtype=np.float64)
+    if (values != np.round(values)).any() or values.min() < -128 or values.max() > 127:
+        raise ValueError(f"{path}: values do not fit in int8")
+    return values.astype(np.int8)
+
+
+if __name__ == "__main__":
+    # python dataset.py [ficheiros.csv...]: converte os CSVs indicados (por omissão todos os training_data*.csv)
+    # Um CSV que não dá para converter fica como está (e continua a ser lido como CSV)
+    for path in sys.argv[1:] or sorted(glob.glob('training_data*.csv')):
+        try:
+            npy_path = convert_csv(path)
+        except ValueError as error:
+            print(f"{path}: não convertido ({error})")
+            continue
+        print(f"{path} ({os.path.getsize(path) // 1024} KiB) -> {npy_path} ({os.path.getsize(npy_path) // 1024} KiB)")
@@ -0,0 +1,109 @@
+import csv
+import glob
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+from dataset import iter_chunks
+from meta import GameMeta, DatasetMeta
+
+CELLS = GameMeta.ROWS * GameMeta.COLS
+HEADER = [f'cell_{i}' for i in range(CELLS)] + ['to_play'] + ['label']
+# Esquema com as alturas das colunas (get_features); as alturas saem das casas e são descartadas
+HEIGHTS_HEADER = HEADER[:-1] + [f'height_{col}' for col in range(GameMeta.COLS)] + ['label']
+VOTES_HEADER = [f'votes_{col}' for col in range(GameMeta.COLS)]
+# Coluna de cada casa depois de espelhar o tabuleiro (as linhas do CSV vêm linha a linha, de cima)
+MIRROR_INDEX = np.array([row * GameMeta.COLS + GameMeta.COLS - 1 - col
+                         for row in range(GameMeta.ROWS) for col in range(GameMeta.COLS)])
+# Pesos fixos para espalhar as posições pelos baldes (iguais em todas as corridas)
+BUCKET_WEIGHTS = np.random.default_rng(GameMeta.ZOBRIST_SEED).integers(1, 2 ** 31, CELLS + 1, dtype=np.int64)
+
+
+def base_schema(chunk, path):
+    # Linhas no esquema casas, to_play, rótulo (as alturas, se houver, são descartadas)
+    if chunk.shape[1] == len(HEIGHTS_HEADER):
+        return chunk[:, list(range(CELLS + 1)) + [-1]]
+    if chunk.shape[1] != len(HEADER):
+        raise ValueError(f"{path}: expected {len(HEADER)} columns (cells, to_play, label)")
+    return chunk
+
+
+def canonicalize(rows):
+    # Entre um tabuleiro e a sua imagem ao espelho fica o menor (ordem lexicográfica); quando é o
+    # espelhado, a jogada passa a ser a coluna simétrica
+    cells = rows[:, :CELLS]
+    mirrored = cells[:, MIRROR_INDEX]
+    differ = cells != mirrored
+    first = differ.argmax(axis=1)
+    index = np.arange(len(rows))
+    flip = differ.any(axis=1) & (mirrored[index, first] < cells[index, first])
+
+    canonical = rows.copy()
+    canonical[flip, :CELLS] = mirrored[flip]
+    canonical[flip, -1] = GameMeta.COLS - 1 - rows[flip, -1]
+    return canonical, flip
+
+
+def deduplicate(inputs, output_file, votes_file=None, buckets=DatasetMeta.BUCKETS, chunk_rows=DatasetMeta.CHUNK_ROWS):
+    # Junta as linhas repetidas (a menos de espelho) de vários CSV/.npy num só CSV, com o rótulo
+    # mais votado (empate: a coluna mais baixa). votes_file recebe, linha a linha, os votos de cada coluna.
+    # Memória limitada: 1.ª passagem reparte as linhas por baldes em disco pelo hash do tabuleiro,
+    # 2.ª agrega um balde de cada vez, e cada posição fica inteira num só balde.
+    stats = {'rows': 0, 'mirrored': 0, 'unique': 0}
+    with tempfile.TemporaryDirectory() as directory:
+        paths = [os.path.join(directory, f'bucket_{i}.bin') for i in range(buckets)]
+        files = [open(path, 'wb') for path in paths]
+        try:
+            for path in inputs:
+                for chunk in iter_chunks(path, chunk_rows):
+                    canonical, flip = canonicalize(base_schema(chunk, path))
+                    stats['rows'] += len(chunk)
+                    stats['mirrored'] += int(flip.sum())
+                    bucket = (canonical[:, :-1].astype(np.int64) @ BUCKET_WEIGHTS) % buckets
+                    for i in np.unique(bucket):
+                        files[i].write(canonical[bucket == i].tobytes())
+        finally:
+            for f in files:
+                f.close()
+
+        with open(output_file, 'w', newline='') as out:
+            writer = csv.writer(out)
+            writer.writerow(HEADER)
+            votes_writer = None
+            if votes_file is not None:
+                votes_out = open(votes_file, 'w', newline='')
+                votes_writer = csv.writer(votes_out)
+                votes_writer.writerow(VOTES_HEADER)
+            try:
+                for path in paths:
+                    rows = np.fromfile(path, dtype=np.int8).reshape(-1, len(HEADER))
+                    if not len(rows):
+                        continue
+                    positions, inverse = np.unique(rows[:, :-1], axis=0, return_inverse=True)
+                    votes = np.zeros((len(positions), GameMeta.COLS), dtype=np.int64)
+                    np.add.at(votes, (inverse.ravel(), rows[:, -1]), 1)
+                    labels = votes.argmax(axis=1)
+                    writer.writerows(np.column_stack((positions, labels)).tolist())
+                    if votes_writer is not None:
+                        votes_writer.writerows(votes.tolist())
+                    stats['unique'] += len(positions)
+            finally:
+                if votes_writer is not None:
+                    votes_out.close()
+    return stats
+
+
+def _has_header(path):
+    with open(path, newline='') as f:
+        return next(csv.reader(f), None) in (HEADER, HEIGHTS_HEADER)
+
+
+if __name__ == "__main__":
+    # python dedup.py saída.csv [entradas...]: por omissão junta todos os training_data*.csv
+    output_file = sys.argv[1] if len(sys.argv) > 1 else "training_data_dedup.csv"
+    inputs = sys.argv[2:] or sorted(path for path in glob.glob('training_data*.csv')
+                                    if path != output_file and _has_header(path))
+    stats = deduplicate(inputs, output_file, votes_file=f"{os.path.splitext(output_file)[0]}_votes.csv")
+    print(f"{stats['rows']} linhas ({stats['mirrored']} espelhadas) -> {stats['unique']} posições em {output_file}")
@@ -2,6 +2,8 @@ from ConnectState import ConnectState
 from mcts import MCTS
 from random_ai import RandomAI
 from random_ai import DecisionTreeAI  #####
+from solver import NegamaxSolver
+from opening_book import load_book
 
 def get_human_move(state):
     while True:
@@ -17,11 +19,20 @@ def get_human_move(state):
 def get_mcts_move(mcts):
     print("Thinking...")
     mcts.search(5)
-    num_rollouts, run_time, num_states = mcts.statistics()
+    num_rollouts, run_time, num_states, num_nodes = mcts.statistics()
     print("Statistics: ", num_rollouts, "rollouts in", run_time, "seconds")
     print("States generated:", num_states)
+    print("Tree size:", num_nodes, "nodes")
     return mcts.best_move()
 
+def get_solver_move(solver):
+    print("Solver thinking...")
+    move = solver.best_move()
+    num_nodes, run_time, depth, exact = solver.statistics()
+    print("Statistics: ", num_nodes, "nodes in", run_time, "seconds")
+    print("Score:", solver.score, "(exact)" if exact else f"(depth {depth})")
+    return move
+
 def get_random_move(random_ai):
     return random_ai.best_move()
 
@@ -38,22 +49,25 @@ def get_player_type(player_num):
                 "2 = MCTS\n"
                 "3 = Random\n"
                 "4 = Decision Tree\n"  ####
+                "5 = Solver\n"
             ))
-            if choice in [1, 2, 3, 4]:  ####
+            if choice in [1, 2, 3, 4, 5]:  ####
                 return choice
             else:
-                print("Please enter 1-4.")
+                print("Please enter 1-5.")
         except ValueError:
             print("Invalid input. Please enter a number.")
 
 def play():
     state = ConnectState()
-    mcts1 = MCTS(state)
-    mcts2 = MCTS(state)
+    book = load_book()
+    mcts1 = MCTS(state, verbose=True, book=book)
+    mcts2 = MCTS(state, verbose=True, book=book)
     random_ai1 = RandomAI(state)
     random_ai2 = RandomAI(state)
     dt_ai1 = DecisionTreeAI()  #####
     dt_ai2 = DecisionTreeAI()  #####
+    solver = NegamaxSolver(state)
     
     player1_type = get_player_type(1)
     player2_type = get_player_type(2)
@@ -69,6 +83,8 @@ def play():
             move = get_mcts_move(mcts1)
         elif player1_type == 3:
             move = get_random_move(random_ai1)
+        elif player1_type == 5:
+            move = get_solver_move(solver)
         else:  # Decision Tree
             move = get_decisiontree_move(dt_ai1, state)
 
@@ -85,6 +101,9 @@ def play():
                 print("Player 1 won!")
             break
 
+        if player1_type == 2 and player2_type == 1:
+            mcts1.start_pondering()  # keeps searching while the human thinks
+
         print("Current state:")
         state.print()
 
@@ -95,6 +114,8 @@ def play():
             move = get_mcts_move(mcts2)
         elif player2_type == 3:
             move = get_random_move(random_ai2)
+        elif player2_type == 5:
+            move = get_solver_move(solver)
         else:  ####
             move = get_decisiontree_move(dt_ai2, state)
 
@@ -111,5 +132,8 @@ def play():
                 print("Player 2 won!")
             break
 
+        if player2_type == 2 and player1_type == 1:
+            mcts2.start_pondering()
+
 if __name__ == "__main__":
     play()
\ No newline at end of file
@@ -10,69 +10,197 @@ class ID3DecisionTree:
         self.tree = None
 
     def fit(self, X, y):
-        X = np.array(X)
-        y = np.array(y)
+        X = np.asarray(X)
+        y = np.asarray(y)
         self.feature_indices = list(range(X.shape[1]))
-        self.tree = self._build_tree(X, y, depth=0)
 
-    def _build_tree(self, X, y, depth):
-        n_samples = X.shape[0]
+        # Pré-ordenação: cada coluna passa à posição do valor no seu vetor de valores distintos
+        # ordenados (o menor inteiro sem sinal que chega: uint8 até 256 valores, uma coluna contígua
+        # por feature), e as classes viram códigos 0..K-1. Memória extra: 1 byte por valor de X,
+        # mais os índices e os códigos de cada linha.
+        self._values = [np.unique(X[:, feature]) for feature in self.feature_indices]
+        dtype = np.min_scalar_type(max(len(values) for values in self._values) - 1)
+        self._ranks = np.empty(X.shape, dtype=dtype, order='F')
+        for feature, values in enumerate(self._values):
+            self._ranks[:, feature] = np.searchsorted(values, X[:, feature])
+        self._classes, codes = np.unique(y, return_inverse=True)
+        self._codes = codes.astype(np.min_scalar_type(len(self._classes) - 1))
+        self._y = y
+
+        # Uma só permutação das linhas, reordenada no lugar: cada nó é uma fatia contígua dela
+        self.tree = self._build_tree(np.arange(len(y), dtype=np.min_scalar_type(len(y))), depth=0)
+        del self._values, self._ranks, self._classes, self._codes, self._y
+
+    def _build_tree(self, indices, depth):
+        # Os nós recebem só uma vista com os índices das suas linhas; X nunca é copiado
+        n_samples = len(indices)
+        codes = self._codes[indices]
         if (self.max_depth and depth >= self.max_depth) or \
            n_samples < self.min_samples_split or \
-           len(np.unique(y)) == 1:
-            return self._make_leaf_node(y)
+           (codes == codes[0]).all():
+            return self._make_leaf_node(self._y[indices])
 
-        best_feature, best_threshold = self._find_best_split(X, y)
+        best_feature, best_rank = self._find_best_split(self._histograms(indices, codes))
         if best_feature is None:
-            return self._make_leaf_node(y)
+            return self._make_leaf_node(self._y[indices])
 
-        left_mask = X[:, best_feature] <= best_threshold
-        right_mask = ~left_mask
+        left_mask = self._ranks[indices, best_feature] <= best_rank
+        n_left = int(left_mask.sum())
+        if n_left == 0 or n_left == n_samples:
+            return self._make_leaf_node(self._y[indices])
 
-        if np.sum(left_mask) == 0 or np.sum(right_mask) == 0:
-            return self._make_leaf_node(y)
-
-        left_subtree = self._build_tree(X[left_mask], y[left_mask], depth + 1)
-        right_subtree = self._build_tree(X[right_mask], y[right_mask], depth + 1)
+        # Linhas da esquerda primeiro, pela ordem original, e os filhos ficam com as duas metades
+        indices[:] = np.concatenate((indices[left_mask], indices[~left_mask]))
+        del left_mask, codes
+        left_subtree = self._build_tree(indices[:n_left], depth + 1)
+        right_subtree = self._build_tree(indices[n_left:], depth + 1)
 
         return {
             'feature': best_feature,
-            'threshold': best_threshold,
+            'threshold': self._values[best_feature][best_rank],
             'left': left_subtree,
             'right': right_subtree
         }
 
-    def _find_best_split(self, X, y):
-        best_gain = -1
-        best_feature = None
-        best_threshold = None
-        for feature in self.feature_indices:
-            thresholds = np.unique(X[:, feature])
-            for threshold in thresholds:
-                gain = self._information_gain(X, y, feature, threshold)
-                if gain > best_gain:
-                    best_gain = gain
-                    best_feature = feature
-                    best_threshold = threshold
-        return best_feature, best_threshold
-
-    def _information_gain(self, X, y, feature, threshold):
-        parent_entropy = self._entropy(y)
-        left_mask = X[:, feature] <= threshold
-        right_mask = ~left_mask
-        if sum(left_mask) == 0 or sum(right_mask) == 0:
-            return 0
-        n = len(y)
-        n_left, n_right = sum(left_mask), sum(right_mask)
-        e_left = self._entropy(y[left_mask])
-        e_right = self._entropy(y[right_mask])
-        child_entropy = (n_left / n) * e_left + (n_right / n) * e_right
-        return parent_entropy - child_entropy
-
-    def _entropy(self, y):
-        counts = Counter(y)
-        proportions = np.array(list(counts.values())) / len(y)
-        return -np.sum(proportions * np.log2(proportions + 1e-10))
+    def fit_chunks(self, chunks):
+        # Treino com memória limitada: chunks() devolve um iterador novo de blocos (X, y), por
+        # exemplo lambda: dataset.chunks('train'). A árvore cresce um nível por passagem nos blocos;
+        # em cada passagem as linhas descem pela árvore já feita e somam-se os histogramas valor x
+        # classe dos nós em aberto, com as mesmas regras de paragem e o mesmo ganho que fit().
+        # Em empate na classe de uma folha fica a menor (fit() fica com a que aparece primeiro).
+        self._values = classes = None
+        for X, y in chunks():
+            X = np.asarray(X)
+            uniques = [np.unique(X[:, feature]) for feature in range(X.shape[1])]
+            if self._values is None:
+                self._values, classes = uniques, np.unique(y)
+            else:
+                self._values = [np.union1d(values, new) for values, new in zip(self._values, uniques)]
+                classes = np.union1d(classes, y)
+        self.feature_indices = list(range(len(self._values)))
+        self._classes = classes
+        n_classes = len(classes)
+
+        # Nós da árvore em listas paralelas: feature -1 é folha ou nó ainda em aberto
+        feature, threshold, left, right, leaves = [-1], [0], [-1], [-1], {}
+        frontier = [0]
+        depth = 0
+        while frontier:
+            position = np.full(len(feature), -1)
+            position[frontier] = np.arange(len(frontier))
+            routing = (np.array(feature), np.array(threshold), np.array(left), np.array(right))
+            histograms = [np.zeros((len(frontier), len(values), n_classes), dtype=np.int64) for values in self._values]
+            for X, y in chunks():
+                node = self._route(np.asarray(X), *routing, depth)
+                rows = position[node] >= 0
+                base = position[node[rows]] * n_classes
+                codes = np.searchsorted(classes, y[rows])
+                for f, values in enumerate(self._values):
+                    ranks = np.searchsorted(values, X[rows, f])
+                    histograms[f] += np.bincount((base * len(values) + ranks * n_classes) + codes,
+                                                 minlength=histograms[f].size).reshape(histograms[f].shape)
+
+            next_frontier = []
+            for i, node in enumerate(frontier):
+                node_histograms = [h[i] for h in histograms]
+                counts = node_histograms[0].sum(axis=0)
+                n_samples = counts.sum()
+                best_feature = None
+                if not ((self.max_depth and depth >= self.max_depth) or n_samples < self.min_samples_split
+                        or (counts == n_samples).any()):
+                    best_feature, best_rank = self._find_best_split(node_histograms)
+                if best_feature is not None:
+                    n_left = node_histograms[best_feature][:best_rank + 1].sum()
+                    if 0 < n_left < n_samples:
+                        feature[node] = best_feature
+                        threshold[node] = self._values[best_feature][best_rank]
+                        left[node], right[node] = len(feature), len(feature) + 1
+                        next_frontier += [len(feature), len(feature) + 1]
+                        feature += [-1, -1]
+                        threshold += [0, 0]
+                        left += [-1, -1]
+                        right += [-1, -1]
+                        continue
+                leaves[node] = self._make_leaf_counts(counts)
+            frontier = next_frontier
+            depth += 1
+
+        self.tree = self._nested(0, feature, threshold, left, right, leaves)
+        del self._values, self._classes
+
+    @staticmethod
+    def _route(X, feature, threshold, left, right, depth):
+        # Nó onde cada linha para, descendo no máximo depth níveis
+        node = np.zeros(len(X), dtype=np.intp)
+        for _ in range(depth):
+            rows = np.flatnonzero(feature[node] >= 0)
+            if len(rows) == 0:
+                break
+            at = node[rows]
+            go_left = X[rows, feature[at]] <= threshold[at]
+            node[rows] = np.where(go_left, left[at], right[at])
+        return node
+
+    def _nested(self, node, feature, threshold, left, right, leaves):
+        # Listas paralelas -> dicionários, no mesmo formato que fit()
+        if node in leaves:
+            return leaves[node]
+        return {
+            'feature': feature[node],
+            'threshold': threshold[node],
+            'left': self._nested(left[node], feature, threshold, left, right, leaves),
+            'right': self._nested(right[node], feature, threshold, left, right, leaves)
+        }
+
+    def _make_leaf_counts(self, counts):
+        present = np.flatnonzero(counts)
+        return {'class': self._classes[int(np.argmax(counts))], 'count': int(counts.sum()),
+                'distribution': {self._classes[i]: int(counts[i]) for i in present}}
+
+    def _histograms(self, indices, codes):
+        # Histograma valor x classe de cada coluna para as linhas do nó, uma coluna de cada vez
+        # (memória temporária proporcional às linhas do nó, não a linhas x colunas)
+        n_classes = len(self._classes)
+        return [np.bincount(self._ranks[indices, feature].astype(np.intp) * n_classes + codes,
+                            minlength=len(values) * n_classes).reshape(len(values), n_classes)
+                for feature, values in enumerate(self._values)]
+
+    def _find_best_split(self, histograms):
+        # Todos os limiares de todas as colunas de uma vez: somas acumuladas dentro de cada coluna
+        # (linhas com valor <= limiar) e ganho de informação vetorizado. Só contam limiares com
+        # valores presentes no nó, como com np.unique.
+        hist = np.concatenate(histograms)
+        sizes = [len(h) for h in histograms]
+        offsets = np.cumsum([0] + sizes[:-1])
+        left = hist.cumsum(axis=0)
+        before = left[offsets - 1]  # Acumulado até ao fim da coluna anterior
+        before[0] = 0
+        left -= np.repeat(before, sizes, axis=0)
+
+        total = histograms[0].sum(axis=0)
+        n = total.sum()
+        right = total - left
+        n_left = left.sum(axis=1)
+        n_right = n - n_left
+
+        parent_entropy = self._entropy_counts(total[None, :], np.array([n]))[0]
+        child_entropy = (n_left / n) * self._entropy_counts(left, n_left) + \
+                        (n_right / n) * self._entropy_counts(right, n_right)
+        gains = np.where((n_left == 0) | (n_right == 0), 0.0, parent_entropy - child_entropy)
+        gains[hist.sum(axis=1) == 0] = -np.inf
+        if not np.isfinite(gains).any():
+            return None, None
+        best = int(np.argmax(gains))
+        feature = int(np.searchsorted(offsets, best, side='right')) - 1
+        return feature, best - int(offsets[feature])
+
+    @staticmethod
+    def _entropy_counts(counts, totals):
+        # Entropia de cada linha de contagens por classe (linhas vazias valem 0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            proportions = counts / totals[:, None]
+            proportions = np.nan_to_num(proportions)
+        return -np.sum(proportions * np.log2(proportions + 1e-10), axis=1)
 
     def _make_leaf_node(self, y):
         counts = Counter(y)
@@ -0,0 +1,79 @@
+import glob
+import os
+
+import numpy as np
+
+from dataset import header_path, iter_chunks, read_header
+from dedup import HEADER, HEIGHTS_HEADER, BUCKET_WEIGHTS, base_schema, canonicalize
+from meta import DatasetMeta
+
+SPLIT_RESOLUTION = 10_000
+
+
+def training_files(pattern='training_data[0-9]*'):
+    # Todos os datasets gerados (training_data<n>) no esquema de treino; um .npy com cabeçalho
+    # substitui o CSV com o mesmo nome. Ficheiros derivados como training_data_dedup.csv ficam de
+    # fora, senão as mesmas linhas entravam duas vezes: para treinar neles, passa-os explicitamente.
+    paths = {}
+    for path in sorted(glob.glob(pattern + '.csv')) + sorted(glob.glob(pattern + '.npy')):
+        if path.endswith('.npy') and not os.path.exists(header_path(path)):
+            continue
+        paths[os.path.splitext(path)[0]] = path
+    return [path for path in paths.values() if _columns(path) in (HEADER, HEIGHTS_HEADER)]
+
+
+def _columns(path):
+    if path.endswith('.npy'):
+        return read_header(path)['columns']
+    with open(path) as f:
+        return f.readline().strip().split(',')
+
+
+class ChunkedDataset:
+    # Vários ficheiros (CSV ou .npy) lidos em blocos de chunk_rows linhas, sem nunca os ter todos
+    # em memória. Cada linha vai para treino ou teste pelo hash da sua posição canónica, por isso
+    # repetições e imagens ao espelho de uma posição ficam sempre do mesmo lado.
+    def __init__(self, paths, test_fraction=DatasetMeta.TEST_FRACTION, chunk_rows=DatasetMeta.CHUNK_ROWS):
+        self.paths = list(paths)
+        self.test_fraction = test_fraction
+        self.chunk_rows = chunk_rows
+
+    def is_test(self, rows):
+        canonical, _ = canonicalize(rows)
+        bucket = (canonical[:, :-1].astype(np.int64) @ BUCKET_WEIGHTS) % SPLIT_RESOLUTION
+        return bucket < self.test_fraction * SPLIT_RESOLUTION
+
+    def chunks(self, split=None):
+        # (X, y) int8 de cada bloco; split='train'/'test' deixa só as linhas desse lado
+        for path in self.paths:
+            for chunk in iter_chunks(path, self.chunk_rows):
+                rows = base_schema(chunk, path)
+                if split is not None:
+                    test = self.is_test(rows)
+                    rows = rows[test if split == 'test' else ~test]
+                if len(rows):
+                    yield rows[:, :-1], rows[:, -1]
+
+    def count(self, split=None):
+        return sum(len(y) for _, y in self.chunks(split))
+
+    def load(self, split='train'):
+        # Arrays int8 pré-alocados e preenchidos bloco a bloco (1 byte por valor, não float64).
+        # O split inteiro fica em memória; para treinar sem isso: ID3DecisionTree.fit_chunks
+        rows = self.count(split)
+        X = np.empty((rows, len(HEADER) - 1), dtype=np.int8)
+        y = np.empty(rows, dtype=np.int8)
+        start = 0
+        for X_chunk, y_chunk in self.chunks(split):
+            X[start:start + len(y_chunk)] = X_chunk
+            y[start:start + len(y_chunk)] = y_chunk
+            start += len(y_chunk)
+        return X, y
+
+    def evaluate(self, model, split='test'):
+        # Acerto do modelo, previsto bloco a bloco
+        correct = total = 0
+        for X, y in self.chunks(split):
+            correct += int((model.predict(X) == y).sum())
+            total += len(y)
+        return correct / total if total else 0.0
@@ -1,10 +1,19 @@
 import random
+import sys
+import threading
 import time
 import math
-from datetime import datetime
+from collections import OrderedDict
+
+import numpy as np
 
 from ConnectState import ConnectState
 from meta import GameMeta, MCTSMeta
+from metrics import SearchMetrics, print_report
+from playout import RandomPolicy, WindowPolicy, evaluate
+from position_cache import SOLVED, SEARCHED
+from solver import NegamaxSolver
+from tree_store import TreeStore
 
 
 class Node:
@@ -14,7 +23,8 @@ class Node:
         self.N = 0
         self.Q = 0
         self.children = {}
-        self.outcome = GameMeta.PLAYERS['none']
+        self.num_moves = None  # Número de jogadas legais, conhecido a partir da primeira expansão
+        self.outcome = GameMeta.PLAYERS['none']  # Resultado provado (MCTS-Solver): vencedor ou empate
 
     def value(self, explore: float = MCTSMeta.EXPLORATION):
         if self.N == 0:
@@ -23,217 +33,641 @@ class Node:
             return self.Q / self.N + explore * math.sqrt(math.log(self.parent.N) / self.N)
 
 
+OUTCOME_VALUES = {GameMeta.OUTCOMES['one']: 1.0, GameMeta.OUTCOMES['two']: 0.0, GameMeta.OUTCOMES['draw']: 0.5}
+
+_node = Node(None, None)
+NODE_BYTES = sys.getsizeof(_node) + sys.getsizeof(_node.__dict__) + sys.getsizeof(dict.fromkeys(range(GameMeta.COLS)))
+
+
 class MCTS:
-    def __init__(self, state=ConnectState()):
+    def __init__(self, state=ConnectState(), seed=None, max_nodes=None, metrics=None, verbose=False, policy=None, evaluator=None,
+                 solver_threshold=MCTSMeta.SOLVER_THRESHOLD, cache=None, book=None):
         self.root_state = state.clone()
-        self.root = Node(None, None)
-        self.run_time = 0
+        self.book = book  # OpeningBook opcional: nas aberturas a jogada vem do livro, sem procurar
+        self.cache = cache  # PositionCache opcional, consultado antes de cada busca
+        # Com até solver_threshold casas vazias o search() passa a posição ao solver exato
+        self.solver_threshold = solver_threshold
+        self.solver = NegamaxSolver(self.root_state, cache=cache) if solver_threshold else None
+        self.policy = policy or WindowPolicy()  # Política das simulações (playout.py)
+        self.evaluator = evaluator or evaluate  # Avaliação estática no fim de simulações truncadas
+        self.metrics = metrics or SearchMetrics()
+        self.verbose = verbose
+        if verbose:
+            self.metrics.callbacks.append(print_report)
+        self.rng = random.Random(seed)
+        self.max_nodes = max_nodes
+        self.free_nodes = []  # Nós de subárvores descartadas, reutilizados antes de criar novos
         self.node_count = 0
+        self.root = self.new_node(None, None)
+        self.run_time = 0
+        self.solver_time = 0  # Tempo de CPU do solver no último search(), descontado do orçamento
         self.num_rollouts = 0
         self.num_states_generated = 0
+        self.ponder_thread = None
+        self.ponder_stop = threading.Event()
+        self.num_ponder_rollouts = 0
 
     def select_node(self):
+        if self.max_nodes is not None and self.node_count >= self.max_nodes:
+            self.prune()
+
         node = self.root
         state = self.root_state.clone()
 
-        while node.children:
-            children = node.children.values()
+        while not state.game_over():
+            # Expande primeiro as jogadas ainda não tentadas neste nó
+            legal_moves = state.get_legal_moves()
+            node.num_moves = len(legal_moves)
+            untried = [move for move in legal_moves if move not in node.children]
+            if untried:
+                start = time.perf_counter()
+                move = self.rng.choice(untried)
+                child = self.new_node(move, node)
+                node.children[move] = child
+                state.move(move)
+                self.num_states_generated += 1
+                if state.game_over():
+                    child.outcome = state.get_outcome()
+                self.metrics.add_time('expand', time.perf_counter() - start)
+                return child, state
+
+            # Subárvores já resolvidas não precisam de mais simulações
+            children = [n for n in node.children.values() if n.outcome == GameMeta.OUTCOMES['none']] or list(node.children.values())
             max_value = max(children, key=lambda n: n.value()).value()
             max_nodes = [n for n in children if n.value() == max_value]
-            node = max_nodes[0] if len(max_nodes) == 1 else random.choice(max_nodes)
+            node = max_nodes[0] if len(max_nodes) == 1 else self.rng.choice(max_nodes)
             state.move(node.move)
             self.num_states_generated += 1
 
-            if node.N == 0:
-                return node, state
-
-        legal_moves = state.get_legal_moves()
-        if not legal_moves or state.game_over():
-            return node, state
-
-        move = random.choice(legal_moves)
-        child = Node(move, node)
-        node.children[move] = child
-        state.move(move)
-        self.num_states_generated += 1
-        return child, state
+        return node, state
 
     def roll_out(self, state: ConnectState, max_depth=50):
-        depth = 0
-        while not state.game_over() and depth < max_depth:
-            legal_moves = state.get_legal_moves()
-            best_move = None
-
-            # 1. Jogada de vitória imediata
-            for move in legal_moves:
-                sim = state.clone()
-                sim.move(move)
-                if sim.check_win() == state.to_play:
-                    best_move = move
+        # Devolve o valor da posição final para o jogador um, em [0, 1]
+        self.num_states_generated += self.policy.roll_out(state, max_depth, self.rng)
+        return self.evaluate(state)
+
+    def evaluate(self, state: ConnectState):
+        # Resultado exato se o jogo acabou; simulação truncada: avaliação estática
+        if state.game_over():
+            return OUTCOME_VALUES[state.get_outcome()]
+        return self.evaluator(state)
+
+    def search(self, time_limit=None, iterations=None, nodes=None):
+        # Orçamentos: tempo de CPU (segundos), iterações e nós (estados gerados); para no primeiro que se esgotar
+        self.stop_pondering()
+        if self.apply_forced_move() or self.use_book() or self.use_cache() or self.solve_endgame(time_limit):
+            return
+
+        metrics = self.metrics
+        metrics.reset()
+        root_depth = len(self.root_state.moves)
+        # O tempo gasto pelo solver sem resolver a posição conta para o orçamento e para o run_time
+        start_time = time.process_time() - self.solver_time
+        total_rollouts = 0
+        self.num_states_generated = 0
+
+        if self.verbose:
+            print("Iniciando MCTS com estatísticas ao vivo...")
+
+        while not self.solved():
+            elapsed = time.process_time() - start_time
+            if time_limit is not None and elapsed >= time_limit:
+                break
+            if iterations is not None and total_rollouts >= iterations:
+                break
+            if nodes is not None and self.num_states_generated >= nodes:
+                break
+
+            if total_rollouts and total_rollouts % MCTSMeta.EARLY_STOP_INTERVAL == 0:
+                remaining = [iterations - total_rollouts] if iterations is not None else []
+                if time_limit is not None and elapsed > self.solver_time:
+                    remaining.append(total_rollouts / (elapsed - self.solver_time) * (time_limit - elapsed))
+                if remaining and self.decided(min(remaining)):
                     break
 
-            if best_move is None:
-                # 2. Bloquear vitória do adversário
-                opponent = GameMeta.PLAYERS['two'] if state.to_play == GameMeta.PLAYERS['one'] else GameMeta.PLAYERS['one']
-                for move in legal_moves:
-                    sim = state.clone()
-                    sim.to_play = opponent
-                    sim.move(move)
-                    if sim.check_win() == opponent:
-                        best_move = move
-                        break
-            
-            if best_move is None:
-                scored_moves = []
-                for move in legal_moves:
-                    sim = state.clone()
-                    sim.move(move)
-                    score = self._count_consecutive(sim, move, state.to_play)
-                    scored_moves.append((score, move))
-
-                if scored_moves:
-                    scored_moves.sort(reverse=True)
-                    _, best_move = scored_moves[0]
-
-            if best_move is None:
-                # 4. Prioridade ao centro
-                center = GameMeta.COLS // 2
-                if center in legal_moves:
-                    best_move = center
-                else:
-                    # 5. Jogada mais próxima do centro
-                    best_move = sorted(legal_moves, key=lambda x: abs(x - center))[0]
-            
-            if best_move not in legal_moves:
-                # Fallback de emergência
-                best_move = random.choice(legal_moves)
-
-            state.move(best_move)
-            self.num_states_generated += 1
-            depth += 1
+            t0 = time.perf_counter()
+            expand_time = metrics.times['expand']
+            node, state = self.select_node()
+            t1 = time.perf_counter()
+            depth = len(state.moves) - root_depth
+            states_before = self.num_states_generated
+            value = self.roll_out(state)
+            t2 = time.perf_counter()
+            self.backpropagate(node, value)
+            t3 = time.perf_counter()
+
+            # O tempo de expansão é medido dentro do select_node e descontado da seleção
+            metrics.add_time('select', t1 - t0 - (metrics.times['expand'] - expand_time))
+            metrics.add_time('rollout', t2 - t1)
+            metrics.add_time('backprop', t3 - t2)
+            metrics.record(depth, self.num_states_generated - states_before)
+            metrics.tick(self)
+            total_rollouts += 1
 
-        return state.get_outcome()
+        self.run_time = time.process_time() - start_time
+        self.num_rollouts = total_rollouts
+        metrics.report(self, final=True)
+        self.store_search()
+
+    def decided(self, remaining):
+        # O filho mais visitado já não pode ser ultrapassado nas iterações que faltam
+        visits = sorted((n for n, _ in self.root_stats().values()), reverse=True)
+        visits += [0] * (len(self.root_state.get_legal_moves()) - len(visits))
+        return len(visits) < 2 or visits[0] - visits[1] > remaining
+
+    def start_pondering(self):
+        # Continua a procurar a partir da raiz atual numa thread enquanto o adversário pensa.
+        # As visitas ficam na árvore e contam para o próximo search().
+        if self.ponder_thread is not None or self.root_state.game_over():
+            return
+        self.ponder_stop.clear()
+        self.num_ponder_rollouts = 0
+        self.ponder_thread = threading.Thread(target=self._ponder, daemon=True)
+        self.ponder_thread.start()
+
+    def stop_pondering(self):
+        if self.ponder_thread is not None:
+            self.ponder_stop.set()
+            self.ponder_thread.join()
+            self.ponder_thread = None
+
+    def _ponder(self):
+        while not self.ponder_stop.is_set() and not self.solved():
+            node, state = self.select_node()
+            value = self.roll_out(state)
+            self.backpropagate(node, value)
+            self.num_ponder_rollouts += 1
 
-    def search(self, time_limit: int):
-        legal_moves = self.root_state.get_legal_moves()
+    def apply_forced_move(self):
+        # Vitória imediata ou bloqueio obrigatório na raiz: não é preciso procurar
         current_player = self.root_state.to_play
         opponent = GameMeta.PLAYERS['two'] if current_player == GameMeta.PLAYERS['one'] else GameMeta.PLAYERS['one']
 
-        for move in legal_moves:
-            simulated = self.root_state.clone()
-            simulated.move(move)
-            if simulated.check_win() == current_player:
-                self.root.children[move] = Node(move, self.root)
-                self.root.children[move].N = 1_000_000
-                self.num_rollouts = 0
-                self.run_time = 0
-                self.num_states_generated = 0
-                return
-
-        for move in legal_moves:
-            simulated = self.root_state.clone()
-            simulated.to_play = opponent
-            simulated.move(move)
-            if simulated.check_win() == opponent:
-                self.root.children[move] = Node(move, self.root)
-                self.root.children[move].N = 500_000
-                self.num_rollouts = 0
-                self.run_time = 0
-                self.num_states_generated = 0
-                return
-
-        start_time = time.process_time()
-        last_time_check = time.time()
-        rollouts_this_second = 0
-        total_rollouts = 0
-        self.num_states_generated = 0
+        wins = self.root_state.winning_moves(current_player)
+        blocks = self.root_state.winning_moves(opponent)
+        if not wins and not blocks:
+            return False
 
-        print("Iniciando MCTS com estatísticas ao vivo...")
+        if wins:
+            self.force_move(wins[0], 1_000_000)
+        else:
+            self.force_move(blocks[0], 500_000)
+        return True
+
+    def use_book(self):
+        move = self.book.lookup(self.root_state) if self.book is not None else None
+        if move is None:
+            return False
+        self.force_move(move, 1_000_000)
+        return True
+
+    def use_cache(self):
+        # Posição já resolvida, ou procurada a fundo noutra corrida: reutiliza a jogada guardada
+        entry = self.cache.get(self.root_state) if self.cache is not None else None
+        if entry is None:
+            return False
+        kind, _, move, visits = entry
+        if kind != SOLVED and visits < MCTSMeta.CACHE_MIN_VISITS:
+            return False
+        self.force_move(move, 1_000_000)
+        return True
+
+    def store_search(self):
+        # Guarda a jogada escolhida e o valor estimado (em %) se a busca foi grande o bastante
+        if self.cache is None or self.solved():
+            return
+        stats = self.root_stats()
+        visits = sum(n for n, _ in stats.values())
+        if visits < MCTSMeta.CACHE_MIN_VISITS:
+            return
+        move = self.best_move()
+        n, q = stats.get(move, (0, 0))
+        self.cache.put(self.root_state, SEARCHED, round(100 * q / n) if n else 50, move, visits)
+
+    def solve_endgame(self, time_limit=None):
+        # Final de jogo: o solver resolve a posição de forma exata, mais depressa que as simulações.
+        # Tem uma parte do orçamento (SOLVER_SHARE, ou SOLVER_TIME_LIMIT se não há limite de tempo);
+        # se não terminar, a busca normal continua com o tempo que sobra.
+        self.solver_time = 0
+        empty = GameMeta.ROWS * GameMeta.COLS - self.root_state.mask.bit_count()
+        if self.solver is None or empty > self.solver_threshold:
+            return False
+
+        if time_limit is not None:
+            self.solver.solve(time_limit=time_limit * MCTSMeta.SOLVER_SHARE)
+        else:
+            self.solver.solve(time_limit=MCTSMeta.SOLVER_TIME_LIMIT)
+        self.solver_time = self.solver.run_time
+        if not self.solver.exact:
+            return False
+        self.add_forced_child(self.solver.best, 1_000_000)
+        self.num_rollouts = 0
+        self.run_time = self.solver.run_time
+        self.num_states_generated = self.solver.nodes
+        return True
 
-        while time.process_time() - start_time < time_limit:
-            node, state = self.select_node()
-            outcome = self.roll_out(state)
-
-            # Estratégica retropropagação
-            reward = 1 if outcome == self.root_state.to_play else 0
-            if outcome == GameMeta.OUTCOMES['draw']:
-                reward = 0.5
-            temp = node
-            while temp:
-                temp.N += 1
-                temp.Q += reward
-                reward = 1 - reward if outcome != GameMeta.OUTCOMES['draw'] else 0.5
-                temp = temp.parent
-
-            rollouts_this_second += 1
-            total_rollouts += 1
+    def force_move(self, move, visits):
+        # Jogada decidida sem procurar: só esse filho recebe visitas e a busca não conta nada
+        self.add_forced_child(move, visits)
+        self.num_rollouts = 0
+        self.run_time = 0
+        self.num_states_generated = 0
 
-            now = time.time()
-            if now - last_time_check >= 1:
-                print(f"[{datetime.now().strftime('%H:%M:%S')}] Iterações por segundo: {rollouts_this_second}")
-                rollouts_this_second = 0
-                last_time_check = now
+    def add_forced_child(self, move, visits):
+        if move not in self.root.children:
+            self.root.children[move] = self.new_node(move, self.root)
+        self.root.children[move].N = visits
+
+    def new_node(self, move, parent):
+        self.node_count += 1
+        if self.free_nodes:
+            node = self.free_nodes.pop()
+            node.__init__(move, parent)
+            return node
+        return Node(move, parent)
+
+    def recycle(self, node):
+        # Devolve a subárvore inteira à lista de nós livres, quebrando os ciclos pai/filho
+        # para que nada fique à espera do garbage collector
+        limit = self.max_nodes or MCTSMeta.FREE_NODES
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            stack.extend(node.children.values())
+            node.children = {}
+            node.parent = None
+            self.node_count -= 1
+            if len(self.free_nodes) < limit:
+                self.free_nodes.append(node)
+
+    def prune(self):
+        # Limite de nós atingido: remove as folhas menos visitadas (as provadas ficam)
+        leaves = []
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            if node.children:
+                stack.extend(node.children.values())
+            elif node is not self.root and node.outcome == GameMeta.OUTCOMES['none']:
+                leaves.append(node)
+
+        leaves.sort(key=lambda n: n.N)
+        excess = self.node_count - int(self.max_nodes * (1 - MCTSMeta.PRUNE_FRACTION))
+        for leaf in leaves[:excess]:
+            del leaf.parent.children[leaf.move]
+            self.recycle(leaf)
+
+    def backpropagate(self, node, value):
+        # O Q de cada nó é contado para o jogador que fez a jogada desse nó
+        path = []
+        while node:
+            path.append(node)
+            node = node.parent
+
+        player = self.root_state.to_play
+        opponent = GameMeta.PLAYERS['two'] if player == GameMeta.PLAYERS['one'] else GameMeta.PLAYERS['one']
+        for depth, node in enumerate(reversed(path)):
+            node.N += 1
+            node.Q += self.reward(value, player if depth % 2 == 1 else opponent)
+
+        # Propaga resultados provados a partir da folha; para no primeiro nó que não fica resolvido
+        for depth in range(len(path) - 1, -1, -1):
+            node = path[len(path) - 1 - depth]
+            if node.outcome == GameMeta.OUTCOMES['none']:
+                node.outcome = self.prove(node, player if depth % 2 == 0 else opponent)
+                if node.outcome == GameMeta.OUTCOMES['none']:
+                    break
 
-        self.run_time = time.process_time() - start_time
-        self.num_rollouts = total_rollouts
+    @staticmethod
+    def prove(node, to_play):
+        # Vitória se algum filho vence para quem joga; derrota/empate só quando todos os filhos estão resolvidos
+        if not node.children:
+            return GameMeta.OUTCOMES['none']
+        outcomes = [child.outcome for child in node.children.values()]
+        if to_play in outcomes:
+            return to_play
+        if len(outcomes) < (node.num_moves or 0) or GameMeta.OUTCOMES['none'] in outcomes:
+            return GameMeta.OUTCOMES['none']
+        if GameMeta.OUTCOMES['draw'] in outcomes:
+            return GameMeta.OUTCOMES['draw']
+        return outcomes[0]
+
+    def solved(self):
+        return self.root.outcome != GameMeta.OUTCOMES['none']
+
+    def root_outcomes(self):
+        return {move: child.outcome for move, child in self.root.children.items()}
+
+    @staticmethod
+    def reward(value, player):
+        return value if player == GameMeta.PLAYERS['one'] else 1 - value
 
     def best_move(self):
-        if (self.root_state.to_play == GameMeta.PLAYERS['one'] and 
-            all(cell == 0 for row in self.root_state.board for cell in row)):
+        # Sem livro de aberturas, o centro no tabuleiro vazio
+        if self.book is None and self.root_state.to_play == GameMeta.PLAYERS['one'] and self.root_state.mask == 0:
             return GameMeta.COLS // 2
 
         if self.root_state.game_over():
             return -1
 
-        max_value = max(self.root.children.values(), key=lambda n: n.N).N
-        max_nodes = [n for n in self.root.children.values() if n.N == max_value]
-        best_child = random.choice(max_nodes)
-        return best_child.move
+        # Vitória provada joga-se já; derrotas provadas só se não houver alternativa
+        player = self.root_state.to_play
+        outcomes = self.root_outcomes()
+        wins = [move for move, outcome in outcomes.items() if outcome == player]
+        if wins:
+            return wins[0]
+
+        stats = self.root_stats()
+        opponent = GameMeta.PLAYERS['two'] if player == GameMeta.PLAYERS['one'] else GameMeta.PLAYERS['one']
+        stats = {move: stat for move, stat in stats.items() if outcomes.get(move) != opponent} or stats
+        max_value = max(n for n, _ in stats.values())
+        max_moves = [move for move, (n, _) in stats.items() if n == max_value]
+        return self.rng.choice(max_moves)
+
+    def root_stats(self):
+        # (N, Q) de cada filho da raiz, por jogada
+        return {move: (child.N, child.Q) for move, child in self.root.children.items()}
 
     def move(self, move):
-        if move in self.root.children:
-            self.root_state.move(move)
-            self.root = self.root.children[move]
+        self.stop_pondering()
+        old_root = self.root
+        self.root_state.move(move)
+        if move in old_root.children:
+            self.root = old_root.children.pop(move)
+            self.root.parent = None  # A retropropagação para na nova raiz
         else:
-            self.root_state.move(move)
-            self.root = Node(None, None)
+            self.root = self.new_node(None, None)
+        self.recycle(old_root)  # Raiz antiga e subárvores irmãs
 
     def statistics(self) -> tuple:
-        return self.num_rollouts, self.run_time, self.num_states_generated
-    
-    def _count_consecutive(self, state, col, player):
-        row = state.last_played[0]
-        directions = [(1, 0), (0, 1), (1, 1), (1, -1)]
-        score = 0
-
-        for dr, dc in directions:
-            count = 1
-            for step in range(1, 3):
-                r, c = row + dr * step, col + dc * step
-                if 0 <= r < GameMeta.ROWS and 0 <= c < GameMeta.COLS and state.board[r][c] == player:
-                    count += 1
-                else:
-                    break
-            if count == 2:
-                score += 10
-            elif count == 3:
-                score += 50
+        return self.num_rollouts, self.run_time, self.num_states_generated, self.node_count
+
+    def tree_bytes(self):
+        # Estimativa: tamanho de um nó típico (objeto, __dict__ e dict de filhos) vezes o número de nós
+        return self.node_count * NODE_BYTES
+
 
-        return score
-    
 class WeakMCTS(MCTS):
-    def __init__(self, state=ConnectState(), rollout_depth=8):
-        super().__init__(state)
+    def __init__(self, state=ConnectState(), rollout_depth=8, **kwargs):
+        kwargs.setdefault('policy', RandomPolicy())
+        kwargs.setdefault('solver_threshold', None)  # O adversário fraco não joga finais perfeitos
+        super().__init__(state, **kwargs)
         self.rollout_depth = rollout_depth
 
     def roll_out(self, state: ConnectState, max_depth=None):
         if max_depth is None:
             max_depth = self.rollout_depth
-        depth = 0
-        while not state.game_over() and depth < max_depth:
-            legal_moves = state.get_legal_moves()
-            move = random.choice(legal_moves)
+        return super().roll_out(state, max_depth)
+
+
+class RaveNode(Node):
+    def __init__(self, move, parent):
+        super().__init__(move, parent)
+        self.AN = 0  # Estatísticas AMAF: simulações em que esta jogada foi feita mais tarde pelo mesmo jogador
+        self.AQ = 0
+
+    def value(self, explore: float = MCTSMeta.EXPLORATION):
+        if self.N == 0:
+            return 0 if explore == 0 else GameMeta.INF
+        q = self.Q / self.N
+        if self.AN:
+            # beta decai com as visitas reais: o AMAF pesa no início e desaparece com o tempo
+            beta = math.sqrt(MCTSMeta.RAVE_EQUIVALENCE / (3 * self.N + MCTSMeta.RAVE_EQUIVALENCE))
+            q = (1 - beta) * q + beta * self.AQ / self.AN
+        return q + explore * math.sqrt(math.log(self.parent.N) / self.N)
+
+
+class RaveMCTS(MCTS):
+    # MCTS com RAVE: cada simulação atualiza também os irmãos cujas jogadas aparecem mais tarde nela
+    def new_node(self, move, parent):
+        self.node_count += 1
+        if self.free_nodes:
+            node = self.free_nodes.pop()
+            node.__init__(move, parent)
+            return node
+        return RaveNode(move, parent)
+
+    def roll_out(self, state: ConnectState, max_depth=50):
+        value = super().roll_out(state, max_depth)
+        self.playout_moves = state.moves  # Seleção + simulação, a partir do início do jogo
+        return value
+
+    def backpropagate(self, node, value):
+        super().backpropagate(node, value)
+
+        path = []
+        while node:
+            path.append(node)
+            node = node.parent
+
+        player = self.root_state.to_play
+        opponent = GameMeta.PLAYERS['two'] if player == GameMeta.PLAYERS['one'] else GameMeta.PLAYERS['one']
+        start = len(self.root_state.moves)
+        for depth, node in enumerate(reversed(path)):
+            # Jogadas feitas, deste nó em diante, pelo jogador que escolhe entre os filhos dele
+            mover = player if depth % 2 == 0 else opponent
+            reward = self.reward(value, mover)
+            # Só conta a primeira peça em cada coluna: é ela que ocupa a casa que o filho ocuparia
+            seen = set()
+            for ply, move in enumerate(self.playout_moves[start + depth:]):
+                if move in seen:
+                    continue
+                seen.add(move)
+                if ply % 2 == 0:
+                    child = node.children.get(move)
+                    if child is not None:
+                        child.AN += 1
+                        child.AQ += reward
+
+
+class TTNode:
+    __slots__ = ('N', 'Q')
+
+    def __init__(self):
+        self.N = 0
+        self.Q = 0
+
+    def value(self, parent_visits, explore: float = MCTSMeta.EXPLORATION):
+        if self.N == 0:
+            return 0 if explore == 0 else GameMeta.INF
+        else:
+            return self.Q / self.N + explore * math.sqrt(math.log(parent_visits) / self.N)
+
+
+# Nó, chave de 64 bits e a entrada (com ligações da LRU) na OrderedDict, aproximadamente
+TT_ENTRY_BYTES = sys.getsizeof(TTNode()) + sys.getsizeof(2 ** 63) + 100
+
+
+class TranspositionMCTS(MCTS):
+    # Posições iguais alcançadas por ordens de jogadas diferentes partilham o mesmo nó,
+    # guardado numa tabela de transposição indexada pelo hash Zobrist da posição
+    def __init__(self, state=ConnectState(), table_size=MCTSMeta.TABLE_SIZE, **kwargs):
+        self.table = OrderedDict()
+        self.table_size = kwargs.get('max_nodes') or table_size
+        super().__init__(state, **kwargs)
+        self.root = self.lookup(self.root_state.hash, create=True)
+
+    def lookup(self, key, create=False):
+        # Tabela LRU: quando cheia, descarta a posição usada há mais tempo
+        node = self.table.get(key)
+        if node is not None:
+            self.table.move_to_end(key)
+        elif create:
+            node = TTNode()
+            self.table[key] = node
+            if len(self.table) > self.table_size:
+                self.table.popitem(last=False)
+            self.node_count = len(self.table)
+        return node
+
+    def select_node(self):
+        node = self.root
+        state = self.root_state.clone()
+        path = [node]
+
+        while not state.game_over():
+            children = []
+            untried = []
+            for move in state.get_legal_moves():
+                child = self.lookup(state.hash_after(move))
+                if child is None:
+                    untried.append(move)
+                else:
+                    children.append((move, child))
+
+            if untried:
+                state.move(self.rng.choice(untried))
+                self.num_states_generated += 1
+                path.append(self.lookup(state.hash, create=True))
+                return path, state
+
+            max_value = max(child.value(node.N) for _, child in children)
+            max_children = [(move, child) for move, child in children if child.value(node.N) == max_value]
+            move, node = self.rng.choice(max_children)
             state.move(move)
             self.num_states_generated += 1
-            depth += 1
-        return state.get_outcome()
\ No newline at end of file
+            path.append(node)
+
+        return path, state
+
+    def backpropagate(self, path, value):
+        # Só os nós do caminho percorrido nesta iteração são atualizados, uma vez cada
+        player = self.root_state.to_play
+        opponent = GameMeta.PLAYERS['two'] if player == GameMeta.PLAYERS['one'] else GameMeta.PLAYERS['one']
+        for depth, node in enumerate(path):
+            node.N += 1
+            node.Q += self.reward(value, player if depth % 2 == 1 else opponent)
+
+    def add_forced_child(self, move, visits):
+        self.lookup(self.root_state.hash_after(move), create=True).N = visits
+
+    def root_stats(self):
+        stats = {}
+        for move in self.root_state.get_legal_moves():
+            child = self.lookup(self.root_state.hash_after(move))
+            if child is not None:
+                stats[move] = (child.N, child.Q)
+        return stats
+
+    def move(self, move):
+        self.stop_pondering()
+        self.root_state.move(move)
+        self.root = self.lookup(self.root_state.hash, create=True)
+
+    def solved(self):
+        return False
+
+    def root_outcomes(self):
+        return {}
+
+    def tree_bytes(self):
+        return len(self.table) * TT_ENTRY_BYTES
+
+
+class CompactMCTS(MCTS):
+    # Mesma busca que MCTS, mas a árvore fica num TreeStore (arrays) em vez de objetos Node.
+    # Os filhos de um nó são todos criados na primeira visita e os não visitados têm valor infinito,
+    # o que equivale a expandir uma jogada não tentada ao acaso.
+    def __init__(self, state=ConnectState(), capacity=1024, **kwargs):
+        super().__init__(state, **kwargs)
+        self.tree = TreeStore(capacity)
+        self.root = self.tree.add_root()
+        self.node_count = self.tree.size
+
+    def select_node(self):
+        tree = self.tree
+        node = self.root
+        state = self.root_state.clone()
+
+        while not state.game_over():
+            if tree.num_children[node] == 0:
+                if self.max_nodes is not None and tree.size + GameMeta.COLS > self.max_nodes:
+                    break  # Limite de nós: simula a partir daqui sem fazer crescer a árvore
+                start = time.perf_counter()
+                tree.expand(node, state.get_legal_moves())
+                self.node_count = tree.size
+                self.metrics.add_time('expand', time.perf_counter() - start)
+
+            first = int(tree.first_child[node])
+            unvisited = np.flatnonzero(tree.N[first:first + int(tree.num_children[node])] == 0)
+            if unvisited.size:
+                child = first + int(self.rng.choice(unvisited))
+                state.move(int(tree.move[child]))
+                self.num_states_generated += 1
+                return child, state
+
+            node = first + int(tree.uct(node).argmax())
+            state.move(int(tree.move[node]))
+            self.num_states_generated += 1
+
+        return node, state
+
+    def backpropagate(self, node, value):
+        tree = self.tree
+        path = []
+        parent = tree.parent
+        while node >= 0:
+            path.append(node)
+            node = parent[node]
+
+        player = self.root_state.to_play
+        opponent = GameMeta.PLAYERS['two'] if player == GameMeta.PLAYERS['one'] else GameMeta.PLAYERS['one']
+        path.reverse()
+        tree.N[path] += 1
+        tree.Q[path[0::2]] += self.reward(value, opponent)
+        tree.Q[path[1::2]] += self.reward(value, player)
+
+    def add_forced_child(self, move, visits):
+        if self.tree.num_children[self.root] == 0:
+            self.tree.expand(self.root, self.root_state.get_legal_moves())
+        self.tree.N[self.tree.child(self.root, move)] = visits
+
+    def solved(self):
+        return False
+
+    def root_outcomes(self):
+        return {}
+
+    def tree_bytes(self):
+        return self.tree.nbytes()
+
+    def root_stats(self):
+        tree = self.tree
+        return {int(tree.move[child]): (int(tree.N[child]), float(tree.Q[child])) for child in tree.children(self.root)}
+
+    def move(self, move):
+        self.stop_pondering()
+        child = self.tree.child(self.root, move) if self.tree.num_children[self.root] else -1
+        self.root_state.move(move)
+        if child >= 0:
+            # Copia só a subárvore da jogada feita; o resto da árvore é libertado
+            self.tree = self.tree.subtree(child)
+        else:
+            self.tree = TreeStore()
+            self.tree.add_root()
+        self.root = 0
+        self.node_count = self.tree.size
+
+
+class CompactWeakMCTS(CompactMCTS, WeakMCTS):
+    pass
@@ -6,7 +6,41 @@ class GameMeta:
     INF = float('inf')
     ROWS = 6
     COLS = 7
+    ZOBRIST_SEED = 2425
 
 
 class MCTSMeta:
     EXPLORATION = math.sqrt(2)
+    TABLE_SIZE = 1_000_000
+    EARLY_STOP_INTERVAL = 100  # Iterations between early-stopping checks
+    PRUNE_FRACTION = 0.1  # Share of max_nodes freed each time the node cap is hit
+    FREE_NODES = 100_000  # Recycled nodes kept for reuse when there is no node cap
+    RAVE_EQUIVALENCE = 1000  # Visits at which RAVE and UCT values weigh the same
+    CACHE_MIN_VISITS = 5_000  # Rollouts a cached search needs before it is reused instead of searching
+    SOLVER_THRESHOLD = 20  # Empty cells at or below which search() hands off to the exact solver
+    SOLVER_SHARE = 0.5  # Share of search()'s time budget the solver may use before MCTS takes over
+    SOLVER_TIME_LIMIT = 0.5  # CPU seconds for the solver when search() has no time budget
+
+
+class SolverMeta:
+    TABLE_SIZE = 2_000_000  # Transposition table entries; cleared when full
+    CHECK_INTERVAL = 4096  # Nodes between time-limit checks
+    TIME_LIMIT = 5  # Default CPU seconds for best_move()
+
+
+class CacheMeta:
+    PATH = 'positions.cache'
+    SLOTS = 1 << 22  # 24 bytes each: 96 MiB file
+    PROBES = 4  # Slots looked at per key before replacing the least valuable one
+
+
+class BookMeta:
+    PATH = 'opening_book.bin'
+    PLIES = 4  # Positions with fewer pieces than this are in the book
+    ITERATIONS = 20_000  # MCTS iterations per book position
+
+
+class DatasetMeta:
+    CHUNK_ROWS = 65_536  # Rows read per block when streaming a dataset
+    BUCKETS = 64  # Hash partitions used by dedup; memory holds one bucket at a time
+    TEST_FRACTION = 0.2  # Share of positions (by hash) held out for evaluation
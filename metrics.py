@@ -0,0 +1,76 @@
+import time
+from datetime import datetime
+
+PHASES = ('select', 'expand', 'rollout', 'backprop')
+
+
+class SearchMetrics:
+    # Counters and per-phase timers filled in by MCTS.search. Every callback receives a
+    # snapshot dict once per interval (seconds) and once more when the search ends.
+    def __init__(self, callbacks=(), interval=1.0):
+        self.callbacks = list(callbacks)
+        self.interval = interval
+        self.reset()
+
+    def reset(self):
+        self.iterations = 0
+        self.rollout_plies = 0
+        self.max_depth = 0
+        self.node_count = 0
+        self.tree_bytes = 0
+        self.states_generated = 0
+        self.times = dict.fromkeys(PHASES, 0.0)
+        self.start_time = time.perf_counter()
+        self.last_report = self.start_time
+        self.last_iterations = 0
+
+    def add_time(self, phase, seconds):
+        self.times[phase] += seconds
+
+    def record(self, depth, plies):
+        self.iterations += 1
+        self.rollout_plies += plies
+        if depth > self.max_depth:
+            self.max_depth = depth
+
+    def tick(self, mcts):
+        if time.perf_counter() - self.last_report >= self.interval:
+            self.report(mcts)
+
+    def report(self, mcts, final=False):
+        self.node_count = mcts.node_count
+        self.tree_bytes = mcts.tree_bytes()
+        self.states_generated = mcts.num_states_generated
+        snapshot = self.snapshot()
+        snapshot['final'] = final
+        self.last_report = time.perf_counter()
+        self.last_iterations = self.iterations
+        for callback in self.callbacks:
+            callback(snapshot)
+
+    def snapshot(self) -> dict:
+        now = time.perf_counter()
+        elapsed = now - self.start_time
+        interval = now - self.last_report
+        return {
+            'iterations': self.iterations,
+            'elapsed': elapsed,
+            'iterations_per_second': (self.iterations - self.last_iterations) / interval if interval > 0 else 0.0,
+            'states_per_second': self.states_generated / elapsed if elapsed > 0 else 0.0,
+            'avg_rollout_length': self.rollout_plies / self.iterations if self.iterations else 0.0,
+            'max_depth': self.max_depth,
+            'node_count': self.node_count,
+            'tree_bytes': self.tree_bytes,
+            'times': dict(self.times),
+        }
+
+
+def print_report(snapshot):
+    # The search's former live output, now opt-in (MCTS(verbose=True))
+    if snapshot['final']:
+        times = ", ".join(f"{phase} {seconds:.3f}s" for phase, seconds in snapshot['times'].items())
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] {snapshot['iterations']} iterações, "
+              f"profundidade máx. {snapshot['max_depth']}, rollout médio {snapshot['avg_rollout_length']:.1f}, "
+              f"{snapshot['node_count']} nós (~{snapshot['tree_bytes'] // 1024} KiB) | {times}")
+    else:
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] Iterações por segundo: {snapshot['iterations_per_second']:.0f}")
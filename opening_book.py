@@ -0,0 +1,125 @@
+import bisect
+import os
+import random
+import struct
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+from ConnectState import ConnectState
+from mcts import MCTS
+from meta import GameMeta, BookMeta
+
+MAGIC = b'C4OB'
+VERSION = 1
+# Cabeçalho: magic, versão, plies cobertos, número de posições; depois as chaves (uint64, ordenadas)
+# e uma jogada (um byte) por chave
+HEADER = struct.Struct('<4sHHI')
+
+
+class OpeningBook:
+    # Jogada para cada posição das primeiras plies, procurada antes por build_book().
+    # As chaves são canónicas (ConnectState.canonical_key), por isso cada posição e a sua imagem ao
+    # espelho ocupam uma só entrada; a procura é uma pesquisa binária nas chaves ordenadas.
+    def __init__(self, path=None):
+        self.keys = array('Q')
+        self.moves = bytearray()
+        self.plies = 0
+        self.hits = 0
+        self.misses = 0
+        if path is not None:
+            self.load(path)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def load(self, path):
+        with open(path, 'rb') as f:
+            magic, version, self.plies, size = HEADER.unpack(f.read(HEADER.size))
+            if magic != MAGIC or version != VERSION:
+                raise ValueError(f"{path} is not an opening book (version {VERSION})")
+            self.keys = array('Q')
+            self.keys.frombytes(f.read(8 * size))
+            self.moves = bytearray(f.read(size))
+
+    def save(self, path):
+        with open(path, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, VERSION, self.plies, len(self.keys)))
+            f.write(self.keys.tobytes())
+            f.write(self.moves)
+
+    def lookup(self, state):
+        # Jogada do livro para a posição, ou None
+        key, mirrored = state.canonical_key()
+        i = bisect.bisect_left(self.keys, key)
+        if i == len(self.keys) or self.keys[i] != key:
+            self.misses += 1
+            return None
+        self.hits += 1
+        move = self.moves[i]
+        return GameMeta.COLS - 1 - move if mirrored else move
+
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+def load_book(path=BookMeta.PATH):
+    # Livro de aberturas se o ficheiro existir; sem ele as aberturas são procuradas normalmente
+    return OpeningBook(path) if os.path.exists(path) else None
+
+
+def book_positions(plies):
+    # Posições (não terminais) com menos de plies peças, uma por classe de simetria:
+    # chave canónica -> (estado, se o estado é a imagem ao espelho da chave)
+    positions = {}
+    frontier = [ConnectState()]
+    for _ in range(plies):
+        next_frontier = []
+        for state in frontier:
+            key, mirrored = state.canonical_key()
+            if key in positions or state.game_over():
+                continue
+            positions[key] = (state, mirrored)
+            for move in state.get_legal_moves():
+                child = state.clone()
+                child.move(move)
+                next_frontier.append(child)
+        frontier = next_frontier
+    return positions
+
+
+def _search_position(state, time_limit, iterations, seed):
+    mcts = MCTS(state, seed=seed)
+    mcts.search(time_limit, iterations)
+    return mcts.best_move()
+
+
+def build_book(path=BookMeta.PATH, plies=BookMeta.PLIES, time_limit=None, iterations=BookMeta.ITERATIONS,
+               workers=None, seed=None):
+    # Procura cada posição das primeiras plies com MCTS (o solver entra sozinho nos finais) em
+    # vários processos e grava o livro
+    rng = random.Random(seed)
+    positions = book_positions(plies)
+    keys = sorted(positions)
+    states = [positions[key][0] for key in keys]
+    seeds = [rng.getrandbits(32) for _ in keys]
+
+    start_time = time.perf_counter()
+    print(f"[{time.strftime('%H:%M:%S')}] A procurar {len(keys)} posições ({plies} plies)...")
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        moves = list(pool.map(_search_position, states, [time_limit] * len(keys), [iterations] * len(keys), seeds,
+                              chunksize=max(1, len(keys) // (4 * (workers or os.cpu_count())))))
+
+    book = OpeningBook()
+    book.plies = plies
+    book.keys = array('Q', keys)
+    # Guarda a jogada na orientação da chave canónica
+    book.moves = bytearray(GameMeta.COLS - 1 - move if positions[key][1] else move for key, move in zip(keys, moves))
+    book.save(path)
+    print(f"Livro com {len(book)} posições salvo em {path} ({time.perf_counter() - start_time:.0f}s)")
+    return book
+
+
+if __name__ == "__main__":
+    build_book()
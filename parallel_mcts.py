@@ -0,0 +1,262 @@
+import multiprocessing
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from ConnectState import ConnectState
+from mcts import MCTS, CompactMCTS
+from meta import GameMeta, MCTSMeta
+from tree_store import SharedTreeStore, TreeStore
+
+LOCK_STRIPES = 64
+
+
+def _root_search(state, budget, seed, mcts_class):
+    # Runs in a worker process: one independent search from the shared root position
+    mcts = mcts_class(state, seed=seed)
+    mcts.search(*budget)
+    num_rollouts, run_time, num_states, num_nodes = mcts.statistics()
+    return mcts.root_stats(), num_rollouts, run_time, num_states, num_nodes
+
+
+class ParallelMCTS:
+    # Root parallelization: K processes search the same root position with different seeds and
+    # the N/Q of the root children are summed before picking the move. Same interface as MCTS.
+    def __init__(self, state=ConnectState(), workers=None, mcts_class=MCTS, seed=None):
+        self.root_state = state.clone()
+        self.workers = workers or os.cpu_count()
+        self.mcts_class = mcts_class
+        self.rng = random.Random(seed)
+        self.pool = None
+        self.stats = {}
+        self.worker_rollouts = []
+        self.run_time = 0
+        self.num_rollouts = 0
+        self.num_states_generated = 0
+        self.node_count = 0
+
+    def search(self, time_limit=None, iterations=None, nodes=None):
+        # Budgets apply to every worker separately
+        if self.pool is None:
+            self.pool = ProcessPoolExecutor(max_workers=self.workers)
+
+        budget = (time_limit, iterations, nodes)
+        futures = [self.pool.submit(_root_search, self.root_state, budget, self.rng.getrandbits(32), self.mcts_class)
+                   for _ in range(self.workers)]
+
+        self.stats = {}
+        self.worker_rollouts = []
+        self.run_time = 0
+        self.num_states_generated = 0
+        self.node_count = 0
+        for future in futures:
+            stats, num_rollouts, run_time, num_states, num_nodes = future.result()
+            for move, (n, q) in stats.items():
+                total_n, total_q = self.stats.get(move, (0, 0))
+                self.stats[move] = (total_n + n, total_q + q)
+            self.worker_rollouts.append(num_rollouts)
+            self.run_time = max(self.run_time, run_time)
+            self.num_states_generated += num_states
+            self.node_count += num_nodes
+        self.num_rollouts = sum(self.worker_rollouts)
+
+    def best_move(self):
+        if self.root_state.to_play == GameMeta.PLAYERS['one'] and self.root_state.mask == 0:
+            return GameMeta.COLS // 2
+
+        if self.root_state.game_over():
+            return -1
+
+        max_value = max(n for n, _ in self.stats.values())
+        max_moves = [move for move, (n, _) in self.stats.items() if n == max_value]
+        return self.rng.choice(max_moves)
+
+    def root_stats(self):
+        return dict(self.stats)
+
+    def move(self, move):
+        self.root_state.move(move)
+        self.stats = {}
+
+    def statistics(self) -> tuple:
+        # Tree size is the sum of the worker trees of the last search
+        return self.num_rollouts, self.run_time, self.num_states_generated, self.node_count
+
+    def worker_statistics(self) -> list:
+        # Rollouts done by each worker in the last search
+        return list(self.worker_rollouts)
+
+    def start_pondering(self):
+        # Same interface as MCTS; the workers keep no tree between searches, so there is
+        # nothing to ponder on
+        pass
+
+    def stop_pondering(self):
+        pass
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+
+
+def free_threaded():
+    # True on free-threaded CPython builds running with the GIL disabled
+    return hasattr(sys, '_is_gil_enabled') and not sys._is_gil_enabled()
+
+
+def _decided(tree, root_state, remaining):
+    # Same test as MCTS.decided on the shared tree: the most visited root child cannot be caught
+    visits = sorted((int(tree.N[child]) for child in tree.children(0)), reverse=True)
+    visits += [0] * (len(root_state.get_legal_moves()) - len(visits))
+    return len(visits) < 2 or visits[0] - visits[1] > remaining
+
+
+def _tree_worker(tree, locks, alloc_lock, root_state, budget, seed, virtual_loss, mcts_class, results, index):
+    # One select/expand/rollout/backprop loop on the shared tree. Every node on the path gets
+    # virtual_loss extra visits (with no reward) while the rollout runs, so the other workers
+    # see it as worse and spread out; backpropagation swaps them for the real result.
+    # results holds the rollouts and states of every worker (shared budgets) and, in the last
+    # slot, the flag that tells every worker to stop.
+    time_limit, iterations, nodes = budget
+    player = mcts_class(root_state, seed=seed)
+    rng = player.rng
+    opponent = GameMeta.PLAYERS['two'] if root_state.to_play == GameMeta.PLAYERS['one'] else GameMeta.PLAYERS['one']
+    rewards_for = (opponent, root_state.to_play)
+    start_time = time.perf_counter()
+    rollouts = 0
+
+    while not results[-1]:
+        elapsed = time.perf_counter() - start_time
+        total_rollouts = sum(results[0:-1:2])
+        if time_limit is not None and elapsed >= time_limit:
+            break
+        if iterations is not None and total_rollouts >= iterations:
+            break
+        if nodes is not None and sum(results[1:-1:2]) >= nodes:
+            break
+
+        if rollouts and rollouts % MCTSMeta.EARLY_STOP_INTERVAL == 0:
+            remaining = [iterations - total_rollouts] if iterations is not None else []
+            if time_limit is not None and elapsed > 0:
+                remaining.append(total_rollouts / elapsed * (time_limit - elapsed))
+            if remaining and _decided(tree, root_state, min(remaining)):
+                results[-1] = 1
+                break
+
+        node = 0
+        state = root_state.clone()
+        path = [node]
+        with locks[node % LOCK_STRIPES]:
+            tree.N[node] += virtual_loss
+
+        while not state.game_over():
+            if tree.num_children[node] == 0:
+                with alloc_lock:
+                    if tree.num_children[node] == 0:
+                        try:
+                            tree.expand(node, state.get_legal_moves())
+                        except MemoryError:
+                            break  # Tree is full: roll out from this node without growing it
+
+            first = int(tree.first_child[node])
+            visits = tree.N[first:first + int(tree.num_children[node])]
+            unvisited = np.flatnonzero(visits == 0)
+            child = first + int(rng.choice(unvisited) if unvisited.size else tree.uct(node).argmax())
+            with locks[child % LOCK_STRIPES]:
+                tree.N[child] += virtual_loss
+            path.append(child)
+            state.move(int(tree.move[child]))
+            player.num_states_generated += 1
+            if unvisited.size:
+                break
+            node = child
+
+        value = player.roll_out(state)
+        for depth, node in enumerate(path):
+            with locks[node % LOCK_STRIPES]:
+                tree.N[node] += 1 - virtual_loss
+                tree.Q[node] += player.reward(value, rewards_for[depth % 2])
+        rollouts += 1
+        results[2 * index] = rollouts
+        results[2 * index + 1] = player.num_states_generated
+
+
+class TreeParallelMCTS(CompactMCTS):
+    # Tree parallelization: several workers run the whole MCTS loop on one shared TreeStore,
+    # using virtual loss and striped locks on N/Q. Threads are used on free-threaded builds
+    # (mode='auto'), otherwise worker processes share the tree through shared memory.
+    def __init__(self, state=ConnectState(), workers=None, capacity=1_000_000, virtual_loss=3,
+                 mode='auto', mcts_class=MCTS, seed=None):
+        super().__init__(state, seed=seed)
+        self.workers = workers or os.cpu_count()
+        self.virtual_loss = virtual_loss
+        self.mode = mode if mode != 'auto' else ('thread' if free_threaded() else 'process')
+        self.mcts_class = mcts_class
+        self.worker_rollouts = []
+        self.tree = SharedTreeStore(capacity)
+        self.root = self.tree.add_root()
+        if self.mode == 'thread':
+            self.locks = [threading.Lock() for _ in range(LOCK_STRIPES)]
+            self.alloc_lock = threading.Lock()
+        else:
+            self.locks = [multiprocessing.Lock() for _ in range(LOCK_STRIPES)]
+            self.alloc_lock = multiprocessing.Lock()
+
+    def search(self, time_limit=None, iterations=None, nodes=None):
+        # Same budgets as MCTS.search, shared by all workers: wall-clock seconds, total iterations
+        # and total states generated; the search stops at the first one used up
+        if time_limit is None and iterations is None and nodes is None:
+            raise ValueError("TreeParallelMCTS.search needs a time_limit, iterations or nodes budget")
+        self.stop_pondering()
+        if self.apply_forced_move() or self.use_book() or self.use_cache() or self.solve_endgame(time_limit):
+            return
+
+        start_time = time.perf_counter() - self.solver_time  # O solver já gastou parte do orçamento
+        if time_limit is not None:
+            time_limit -= self.solver_time
+        if self.mode == 'thread':
+            results = [0] * (2 * self.workers + 1)
+            runner = threading.Thread
+        else:
+            results = multiprocessing.Array('q', 2 * self.workers + 1, lock=False)
+            runner = multiprocessing.Process
+        budget = (time_limit, iterations, nodes)
+        workers = [runner(target=_tree_worker,
+                          args=(self.tree, self.locks, self.alloc_lock, self.root_state, budget,
+                                self.rng.getrandbits(32), self.virtual_loss, self.mcts_class, results, i))
+                   for i in range(self.workers)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        self.run_time = time.perf_counter() - start_time
+        self.worker_rollouts = list(results[0:-1:2])
+        self.num_rollouts = sum(self.worker_rollouts)
+        self.num_states_generated = sum(results[1:-1:2])
+        self.node_count = self.tree.size
+        self.store_search()
+
+    def worker_statistics(self) -> list:
+        return list(self.worker_rollouts)
+
+    def move(self, move):
+        self.stop_pondering()
+        child = self.tree.child(self.root, move) if self.tree.num_children[self.root] else -1
+        self.root_state.move(move)
+        if child >= 0:
+            self.tree.load(self.tree.subtree(child))
+        else:
+            self.tree.load(TreeStore())
+            self.tree.add_root()
+        self.root = 0
+        self.node_count = self.tree.size
+
+    def close(self):
+        self.tree.close(unlink=True)
@@ -0,0 +1,123 @@
+import math
+
+from ConnectState import cell_index
+from meta import GameMeta
+
+
+def _windows():
+    # Every four-in-a-row window on the board (69 on 6x7), as lists of bitboard indices
+    windows = []
+    for row in range(GameMeta.ROWS):
+        for col in range(GameMeta.COLS):
+            for dr, dc in ((0, 1), (1, 0), (1, 1), (1, -1)):
+                cells = [(row + dr * i, col + dc * i) for i in range(4)]
+                if all(0 <= r < GameMeta.ROWS and 0 <= c < GameMeta.COLS for r, c in cells):
+                    windows.append([cell_index(r, c) for r, c in cells])
+    return windows
+
+
+WINDOWS = _windows()
+WINDOW_MASKS = [sum(1 << index for index in window) for window in WINDOWS]
+# Windows that go through each cell, indexed like the bitboard
+CELL_WINDOWS = [[w for w, window in enumerate(WINDOWS) if index in window]
+                for index in range(GameMeta.COLS * (GameMeta.ROWS + 1))]
+
+# Score of a move per window through its cell that the opponent has not touched, by how many
+# of our pieces are already there: opens a window, makes 2 in a row, makes 3 in a row.
+# Central cells sit in more windows, so this also prefers the center.
+WINDOW_SCORES = (1, 10, 50)
+
+# Static evaluation: value of a window held by one player only, by piece count, and of each
+# empty cell that would complete four. EVAL_SCALE sets how fast the logistic saturates.
+WINDOW_VALUES = (0, 1, 4, 16)
+THREAT_VALUE = 24
+EVAL_SCALE = 32
+
+
+class RandomPolicy:
+    # Uniform random playouts (WeakMCTS)
+    def roll_out(self, state, max_depth, rng):
+        plies = 0
+        while plies < max_depth and not state.game_over():
+            state.move(rng.choice(state.get_legal_moves()))
+            plies += 1
+        return plies
+
+
+class WindowPolicy:
+    # Heuristic playouts: win, else block, else the move with the best open-window score
+    # (ties broken at random). Piece counts per window are built once per rollout and kept
+    # up to date move by move, so every choice is a table lookup.
+    def roll_out(self, state, max_depth, rng):
+        if state.game_over():
+            return 0
+
+        counts = [None] * len(GameMeta.PLAYERS)
+        for player in (GameMeta.PLAYERS['one'], GameMeta.PLAYERS['two']):
+            pieces = state.pieces[player]
+            counts[player] = [(pieces & mask).bit_count() for mask in WINDOW_MASKS]
+
+        plies = 0
+        while plies < max_depth:
+            legal_moves = state.get_legal_moves()
+            if not legal_moves:
+                break
+            player = state.to_play
+            mine = counts[player]
+            theirs = counts[GameMeta.PLAYERS['two'] if player == GameMeta.PLAYERS['one'] else GameMeta.PLAYERS['one']]
+
+            win = block = None
+            best_score = -1
+            best_moves = []
+            for col in legal_moves:
+                score = 0
+                for w in CELL_WINDOWS[cell_index(state.height[col], col)]:
+                    if theirs[w] == 0:
+                        if mine[w] == 3:
+                            win = col
+                            break
+                        score += WINDOW_SCORES[mine[w]]
+                    elif mine[w] == 0 and theirs[w] == 3:
+                        block = col
+                if win is not None:
+                    break
+                if score > best_score:
+                    best_score = score
+                    best_moves = [col]
+                elif score == best_score:
+                    best_moves.append(col)
+
+            if win is not None:
+                move = win
+            elif block is not None:
+                move = block
+            else:
+                move = best_moves[0] if len(best_moves) == 1 else rng.choice(best_moves)
+
+            for w in CELL_WINDOWS[cell_index(state.height[move], move)]:
+                mine[w] += 1
+            state.move(move)
+            plies += 1
+            if win is not None:
+                break  # Only a completed window can end the game before the board fills up
+
+        return plies
+
+
+def evaluate(state):
+    # Estimated result of a non-terminal position for player one, in [0, 1]
+    one = GameMeta.PLAYERS['one']
+    two = GameMeta.PLAYERS['two']
+    if state.winning_moves(state.to_play):
+        return 1.0 if state.to_play == one else 0.0
+
+    pieces_one = state.pieces[one]
+    pieces_two = state.pieces[two]
+    score = 0
+    for mask in WINDOW_MASKS:
+        if not pieces_two & mask:
+            score += WINDOW_VALUES[(pieces_one & mask).bit_count()]
+        elif not pieces_one & mask:
+            score -= WINDOW_VALUES[(pieces_two & mask).bit_count()]
+    score += THREAT_VALUE * (state.threats(one).bit_count() - state.threats(two).bit_count())
+    return 1 / (1 + math.exp(-score / EVAL_SCALE))
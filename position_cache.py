@@ -0,0 +1,131 @@
+import mmap
+import os
+import struct
+
+from meta import GameMeta, CacheMeta
+
+MAGIC = b'C4PC'
+VERSION = 2
+# Cabeçalho: magic, versão, bytes por entrada, número de entradas
+HEADER = struct.Struct('<4sHHQ')
+# Slot: contador de sequência (uint64, ímpar enquanto o escritor reescreve a entrada) seguido da
+# entrada: chave da posição (0 = vazia), visitas, tipo, jogada, score
+ENTRY = struct.Struct('<QIBbbx')
+SLOT_SIZE = 8 + ENTRY.size
+READ_RETRIES = 100  # Tentativas de leitura de uma entrada que está sempre a ser reescrita
+
+SOLVED = 1  # Score exato do solver (do ponto de vista de quem joga)
+SEARCHED = 2  # Jogada escolhida por uma busca MCTS; score = valor estimado em %, visits = simulações
+
+
+class PositionCache:
+    # Tabela de hash de tamanho fixo num ficheiro mapeado em memória: posição -> resultado.
+    # Muitos processos podem ler ao mesmo tempo; só um (writable=True) escreve.
+    # Com mirror=True uma posição e a sua imagem ao espelho partilham a entrada (a jogada é espelhada).
+    def __init__(self, path=CacheMeta.PATH, slots=CacheMeta.SLOTS, writable=False, mirror=True):
+        self.path = path
+        self.writable = writable
+        self.mirror = mirror
+        self.hits = 0
+        self.misses = 0
+
+        if writable and not os.path.exists(path):
+            with open(path, 'wb') as f:
+                f.write(HEADER.pack(MAGIC, VERSION, SLOT_SIZE, slots))
+                f.truncate(HEADER.size + slots * SLOT_SIZE)
+
+        with open(path, 'r+b' if writable else 'rb') as f:
+            self.buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ)
+        magic, version, slot_size, self.slots = HEADER.unpack_from(self.buffer, 0)
+        if magic != MAGIC or version != VERSION or slot_size != SLOT_SIZE:
+            self.buffer.close()
+            raise ValueError(f"{path} is not a position cache (version {VERSION})")
+        # Os contadores são lidos e escritos como palavras de 8 bytes alinhadas (ordem nativa), numa só operação
+        # (struct.pack_into apaga a zona com zeros antes de a preencher)
+        self.sequences = memoryview(self.buffer).cast('Q')
+
+    def _offsets(self, key):
+        # Sondagem linear a partir de um slot obtido por hash multiplicativo da chave
+        start = ((key * 0x9E3779B97F4A7C15) & 0xFFFFFFFFFFFFFFFF) % self.slots
+        for i in range(CacheMeta.PROBES):
+            yield HEADER.size + (start + i) % self.slots * SLOT_SIZE
+
+    def _key(self, state):
+        if self.mirror:
+            return state.canonical_key()
+        return state.key(), False
+
+    def _read(self, offset):
+        # Leitura consistente de uma entrada (seqlock): o contador tem de ser par e igual antes e
+        # depois da cópia, senão o escritor mexeu na entrada entretanto e lê-se de novo
+        index = offset // 8
+        for _ in range(READ_RETRIES):
+            sequence = self.sequences[index]
+            if sequence % 2 == 0:
+                entry = ENTRY.unpack_from(self.buffer, offset + 8)
+                if self.sequences[index] == sequence:
+                    return entry
+        return None
+
+    def get(self, state):
+        # (tipo, score, jogada, visitas) da posição, ou None
+        key, mirrored = self._key(state)
+        for offset in self._offsets(key):
+            entry = self._read(offset)
+            if entry is None:
+                break
+            slot_key, visits, kind, move, score = entry
+            if slot_key == key:
+                self.hits += 1
+                if mirrored:
+                    move = GameMeta.COLS - 1 - move
+                return kind, score, move, visits
+            if slot_key == 0:
+                break
+        self.misses += 1
+        return None
+
+    def put(self, state, kind, score, move, visits=0):
+        # Substitui a mesma posição ou um slot vazio; senão, a entrada menos valiosa da sondagem
+        # (resultados exatos valem mais que buscas, e buscas maiores mais que buscas menores)
+        if not self.writable:
+            return
+        key, mirrored = self._key(state)
+        if mirrored:
+            move = GameMeta.COLS - 1 - move
+        priority = (kind == SOLVED, visits)
+        target = None
+        target_priority = None
+        for offset in self._offsets(key):
+            slot_key, slot_visits, slot_kind, _, _ = ENTRY.unpack_from(self.buffer, offset + 8)
+            slot_priority = (slot_kind == SOLVED, slot_visits)
+            if slot_key == key or slot_key == 0:
+                if slot_key == key and slot_priority > priority:
+                    return
+                target = offset
+                break
+            if target is None or slot_priority < target_priority:
+                target, target_priority = offset, slot_priority
+        else:
+            if target_priority >= priority:
+                return
+
+        # Contador ímpar durante a escrita e par no fim: os leitores descartam cópias feitas a meio
+        index = target // 8
+        sequence = self.sequences[index]
+        self.sequences[index] = sequence + 1
+        ENTRY.pack_into(self.buffer, target + 8, key, min(visits, 0xFFFFFFFF), kind, move, score)
+        self.sequences[index] = sequence + 2
+
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def flush(self):
+        if self.writable:
+            self.buffer.flush()
+
+    def close(self):
+        self.flush()
+        self.sequences.release()
+        self.buffer.close()
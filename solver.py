@@ -0,0 +1,199 @@
+import time
+
+from ConnectState import ConnectState, COLUMN_MASK, TOP_MASK
+from meta import GameMeta, SolverMeta
+from position_cache import SOLVED
+
+CELLS = GameMeta.ROWS * GameMeta.COLS
+# Colunas do centro para as bordas: as jogadas centrais costumam ser as melhores e cortam mais cedo
+MOVE_ORDER = sorted(range(GameMeta.COLS), key=lambda col: abs(col - GameMeta.COLS // 2))
+
+EXACT, LOWER, UPPER = 0, 1, 2  # Tipo do valor guardado na tabela de transposição
+
+
+class SearchTimeout(Exception):
+    pass
+
+
+class NegamaxSolver:
+    # Busca exata: negamax com poda alfa-beta, aprofundamento iterativo, colunas do centro para
+    # as bordas e tabela de transposição indexada pelo hash Zobrist da posição.
+    # O score é do ponto de vista de quem joga: positivo ganha, negativo perde, 0 é empate, e
+    # vitórias mais rápidas valem mais: (CELLS + 1 - peças) // 2 para quem ganha com a próxima peça.
+    def __init__(self, state=ConnectState(), table_size=SolverMeta.TABLE_SIZE, cache=None):
+        self.state = state
+        self.cache = cache  # PositionCache opcional: resultados exatos de corridas anteriores
+        self.table_size = table_size
+        self.table = {}  # hash -> (tipo, valor); só guarda subárvores resolvidas até ao fim
+        self.deadline = None
+        self.horizon = 0  # Folhas cortadas pela profundidade na iteração atual
+        self.nodes = 0
+        self.run_time = 0
+        self.score = None
+        self.best = None
+        self.depth = 0
+        self.exact = False
+        self.to_play = state.to_play
+
+    def solve(self, state=None, time_limit=None):
+        # Aprofunda uma jogada de cada vez até o resultado ficar exato (nenhuma folha cortada pela
+        # profundidade) ou o tempo de CPU acabar. Devolve o score da última iteração completa.
+        state = (state or self.state).clone()
+        start_time = time.process_time()
+        self.deadline = start_time + time_limit if time_limit is not None else None
+        self.nodes = 0
+        self.score = None
+        self.best = None
+        self.depth = 0
+        self.exact = False
+        self.to_play = state.to_play
+
+        entry = self.cache.get(state) if self.cache is not None else None
+        if entry is not None and entry[0] == SOLVED:
+            _, self.score, self.best, _ = entry
+            self.depth = CELLS - state.mask.bit_count()
+            self.exact = True
+        elif not state.game_over():
+            for depth in range(1, CELLS - state.mask.bit_count() + 1):
+                self.horizon = 0
+                try:
+                    move, score = self.search_root(state, depth)
+                except SearchTimeout:
+                    break
+                self.best, self.score, self.depth = move, score, depth
+                if self.horizon == 0:
+                    self.exact = True
+                    if self.cache is not None:
+                        self.cache.put(state, SOLVED, score, move, self.nodes)
+                    break
+
+        self.run_time = time.process_time() - start_time
+        return self.score
+
+    def search_root(self, state, depth):
+        player = state.to_play
+        wins = state.winning_moves(player)
+        if wins:
+            return wins[0], (CELLS + 1 - state.mask.bit_count()) // 2
+
+        # A melhor jogada da iteração anterior é a primeira a ser tentada
+        order = MOVE_ORDER if self.best is None else [self.best] + [col for col in MOVE_ORDER if col != self.best]
+        best_move = None
+        alpha = -CELLS
+        for col in order:
+            if state.mask & TOP_MASK[col]:
+                continue
+            state.move(col)
+            score = -self.negamax(state, depth - 1, -CELLS, -alpha)
+            state.undo()
+            if best_move is None or score > alpha:
+                best_move, alpha = col, score
+        return best_move, alpha
+
+    def negamax(self, state, depth, alpha, beta):
+        # Chamado só em posições em que a última jogada não ganhou
+        self.nodes += 1
+        if self.deadline is not None and self.nodes % SolverMeta.CHECK_INTERVAL == 0 \
+                and time.process_time() > self.deadline:
+            raise SearchTimeout
+
+        played = state.mask.bit_count()
+        if played == CELLS:
+            return 0
+
+        player = state.to_play
+        opponent = GameMeta.PLAYERS['two'] if player == GameMeta.PLAYERS['one'] else GameMeta.PLAYERS['one']
+        possible = state.playable()
+        if state.threats(player) & possible:
+            return (CELLS + 1 - played) // 2
+
+        # Só jogadas que não perdem já: bloqueia a ameaça do adversário (duas é derrota) e
+        # não joga logo abaixo de uma casa onde ele ganharia
+        opponent_wins = state.threats(opponent)
+        forced = possible & opponent_wins
+        if forced:
+            if forced & (forced - 1):
+                return -((CELLS - played) // 2)
+            possible = forced
+        possible &= ~(opponent_wins >> 1)
+        if not possible:
+            return -((CELLS - played) // 2)
+        if played >= CELLS - 2:
+            return 0  # Sobra uma jogada a cada um e nenhuma ganha
+
+        if depth == 0:
+            self.horizon += 1
+            return 0  # Resultado desconhecido: conta como empate nesta iteração
+
+        # Limites do score possível a partir daqui: não ganhamos antes da nossa segunda peça,
+        # e o adversário não ganha com a próxima
+        max_score = (CELLS - 1 - played) // 2
+        if beta > max_score:
+            beta = max_score
+            if alpha >= beta:
+                return beta
+        min_score = -((CELLS - 2 - played) // 2)
+        if alpha < min_score:
+            alpha = min_score
+            if alpha >= beta:
+                return alpha
+
+        entry = self.table.get(state.hash)
+        if entry is not None:
+            kind, value = entry
+            if kind == EXACT:
+                return value
+            if kind == LOWER:
+                alpha = max(alpha, value)
+            else:
+                beta = min(beta, value)
+            if alpha >= beta:
+                return value
+
+        alpha_start = alpha
+        horizon = self.horizon
+        best = -CELLS
+        for col in MOVE_ORDER:
+            if possible & COLUMN_MASK[col]:
+                state.move(col)
+                score = -self.negamax(state, depth - 1, -beta, -alpha)
+                state.undo()
+                if score > best:
+                    best = score
+                    if best > alpha:
+                        alpha = best
+                        if alpha >= beta:
+                            break
+
+        # Valores que dependem de folhas cortadas pela profundidade não são guardados
+        if self.horizon == horizon:
+            if len(self.table) >= self.table_size:
+                self.table.clear()
+            kind = UPPER if best <= alpha_start else LOWER if best >= beta else EXACT
+            self.table[state.hash] = (kind, best)
+        return best
+
+    def best_move(self, time_limit=SolverMeta.TIME_LIMIT):
+        if self.state.to_play == GameMeta.PLAYERS['one'] and self.state.mask == 0:
+            return GameMeta.COLS // 2
+
+        if self.state.game_over():
+            return -1
+
+        self.solve(time_limit=time_limit)
+        if self.best is None:
+            return next(col for col in MOVE_ORDER if not self.state.mask & TOP_MASK[col])
+        return self.best
+
+    def outcome(self):
+        # Resultado provado pela última busca (GameMeta.OUTCOMES), ou 'none' se não foi exata
+        if not self.exact or self.score is None:
+            return GameMeta.OUTCOMES['none']
+        if self.score == 0:
+            return GameMeta.OUTCOMES['draw']
+        player = self.to_play
+        opponent = GameMeta.PLAYERS['two'] if player == GameMeta.PLAYERS['one'] else GameMeta.PLAYERS['one']
+        return player if self.score > 0 else opponent
+
+    def statistics(self) -> tuple:
+        return self.nodes, self.run_time, self.depth, self.exact
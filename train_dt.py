@@ -1,33 +1,32 @@
 import numpy as np
+from dataset import load_dataset
 from id3_decision_tree import ID3DecisionTree
 from ConnectState import ConnectState
-from sklearn.metrics import accuracy_score
-from sklearn.model_selection import train_test_split
+from loader import ChunkedDataset, training_files
 
 def load_training_data(filename):
-    data = np.loadtxt(filename, delimiter=',', skiprows=1)
+    if filename.endswith('.npy'):
+        # Formato binário (dataset.py): int8 mapeado em memória, X e y são vistas sem cópia
+        data, _ = load_dataset(filename)
+    else:
+        data = np.loadtxt(filename, delimiter=',', skiprows=1)
     X = data[:, :-1]  #os 42 estados 
     y = data[:, -1]   #ultima coluna movida
     return X, y
 
-def train_model():
-    # Load data
-    X, y = load_training_data("training_data6.csv")
+def train_model(paths=None):
+    # Todos os datasets (CSV ou .npy) lidos em blocos; split treino/teste pelo hash de cada posição.
+    # O treino também é feito bloco a bloco (um nível da árvore por passagem), sem carregar o split.
+    data = ChunkedDataset(paths or training_files())
+    print(f"{data.count('train')} training rows from {len(data.paths)} files")
 
-    
-    # Split data (80% train, 20% test)
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=0)
-    
     # Train model
     dt = ID3DecisionTree(max_depth=10)
-    dt.fit(X_train, y_train)
+    dt.fit_chunks(lambda: data.chunks('train'))
     
     # Evaluate
-    train_pred = dt.predict(X_train)
-    test_pred = dt.predict(X_test)
-    
-    train_acc = accuracy_score(y_train, train_pred)
-    test_acc = accuracy_score(y_test, test_pred)
+    train_acc = data.evaluate(dt, 'train')
+    test_acc = data.evaluate(dt, 'test')
     
     print(f"\nTraining Accuracy: {train_acc:.2%}")
     print(f"Test Accuracy: {test_acc:.2%}")
@@ -0,0 +1,170 @@
+import math
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from meta import GameMeta, MCTSMeta
+
+
+class TreeStore:
+    # MCTS tree kept as parallel arrays indexed by node id instead of one Node object per position.
+    # The children of a node are allocated together, so they occupy the contiguous ids
+    # first_child[node] .. first_child[node] + num_children[node] - 1.
+    def __init__(self, capacity=1024):
+        self.size = 0
+        self.N = np.zeros(capacity, dtype=np.int64)
+        self.Q = np.zeros(capacity, dtype=np.float64)
+        self.parent = np.full(capacity, -1, dtype=np.int32)
+        self.first_child = np.full(capacity, -1, dtype=np.int32)
+        self.num_children = np.zeros(capacity, dtype=np.int8)
+        self.move = np.full(capacity, -1, dtype=np.int8)
+
+    def capacity(self):
+        return len(self.N)
+
+    def nbytes(self):
+        return sum(array.nbytes for array in (self.N, self.Q, self.parent, self.first_child, self.num_children, self.move))
+
+    def _reserve(self, count):
+        # Grows every array geometrically so allocation stays amortized O(1)
+        needed = self.size + count
+        if needed <= self.capacity():
+            return
+        capacity = max(needed, 2 * self.capacity())
+        extra = capacity - self.capacity()
+        self.N = np.concatenate((self.N, np.zeros(extra, dtype=self.N.dtype)))
+        self.Q = np.concatenate((self.Q, np.zeros(extra, dtype=self.Q.dtype)))
+        self.parent = np.concatenate((self.parent, np.full(extra, -1, dtype=self.parent.dtype)))
+        self.first_child = np.concatenate((self.first_child, np.full(extra, -1, dtype=self.first_child.dtype)))
+        self.num_children = np.concatenate((self.num_children, np.zeros(extra, dtype=self.num_children.dtype)))
+        self.move = np.concatenate((self.move, np.full(extra, -1, dtype=self.move.dtype)))
+
+    def add_root(self):
+        self._reserve(1)
+        node = self.size
+        self.size += 1
+        return node
+
+    def expand(self, node, moves):
+        # Allocates one child per move as a contiguous block and returns the id of the first one
+        count = len(moves)
+        self._reserve(count)
+        first = self.size
+        self.size += count
+        self.parent[first:first + count] = node
+        self.move[first:first + count] = moves
+        self.first_child[node] = first
+        self.num_children[node] = count
+        return first
+
+    def children(self, node):
+        first = int(self.first_child[node])
+        return range(first, first + int(self.num_children[node]))
+
+    def child(self, node, move):
+        for child in self.children(node):
+            if self.move[child] == move:
+                return child
+        return -1
+
+    def uct(self, node, explore: float = MCTSMeta.EXPLORATION):
+        # UCT score of every child of node in one vectorized pass
+        first = int(self.first_child[node])
+        count = int(self.num_children[node])
+        n = self.N[first:first + count]
+        unvisited = n == 0
+        if unvisited.any():
+            n = np.where(unvisited, 1, n)
+        scores = self.Q[first:first + count] / n + explore * np.sqrt(math.log(max(self.N[node], 1)) / n)
+        if unvisited.any():
+            scores[unvisited] = 0 if explore == 0 else GameMeta.INF
+        return scores
+
+    def subtree(self, root):
+        # Copies the subtree under root into a fresh store, renumbered breadth-first, so the
+        # rest of the tree can be freed after the root moves down
+        tree = TreeStore()
+        tree.N[0] = self.N[root]
+        tree.Q[0] = self.Q[root]
+        tree.size = 1
+        queue = [(root, 0)]
+        for old, new in queue:
+            count = int(self.num_children[old])
+            if count == 0:
+                continue
+            old_first = int(self.first_child[old])
+            new_first = tree.expand(new, self.move[old_first:old_first + count])
+            tree.N[new_first:new_first + count] = self.N[old_first:old_first + count]
+            tree.Q[new_first:new_first + count] = self.Q[old_first:old_first + count]
+            queue.extend((old_first + i, new_first + i) for i in range(count))
+        return tree
+
+
+class SharedTreeStore(TreeStore):
+    # Fixed-capacity TreeStore whose arrays (and node count) live in one shared memory block,
+    # so several worker threads or processes can search the same tree. Callers serialize
+    # expand() themselves; when the block is full expand() raises MemoryError.
+    FIELDS = (('N', np.int64, 0), ('Q', np.float64, 0), ('parent', np.int32, -1),
+              ('first_child', np.int32, -1), ('num_children', np.int8, 0), ('move', np.int8, -1))
+
+    def __init__(self, capacity, name=None):
+        self._capacity = capacity
+        nbytes = 8 + sum(np.dtype(dtype).itemsize for _, dtype, _ in self.FIELDS) * capacity
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=nbytes)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+        self._attach(fill=name is None)
+
+    def _attach(self, fill):
+        # Header (node count) first, then the fields from the widest dtype down so every view is aligned
+        self._size = np.ndarray(1, dtype=np.int64, buffer=self.shm.buf)
+        offset = 8
+        for field, dtype, default in self.FIELDS:
+            array = np.ndarray(self._capacity, dtype=dtype, buffer=self.shm.buf, offset=offset)
+            if fill:
+                array[:] = default
+            setattr(self, field, array)
+            offset += array.nbytes
+        if fill:
+            self._size[0] = 0
+
+    def __getstate__(self):
+        return self._capacity, self.shm.name
+
+    def __setstate__(self, state):
+        self._capacity, name = state
+        self.shm = shared_memory.SharedMemory(name=name)
+        self._attach(fill=False)
+
+    @property
+    def size(self):
+        return int(self._size[0])
+
+    @size.setter
+    def size(self, value):
+        self._size[0] = value
+
+    def _reserve(self, count):
+        if self.size + count > self._capacity:
+            raise MemoryError("SharedTreeStore is full")
+
+    def load(self, tree: TreeStore):
+        # Replaces the contents with another store, e.g. the subtree kept after a move
+        size = tree.size
+        if size > self._capacity:
+            raise MemoryError("SharedTreeStore is full")
+        for field, _, default in self.FIELDS:
+            array = getattr(self, field)
+            array[:size] = getattr(tree, field)[:size]
+            array[size:self.size] = default
+        self.size = size
+
+    def close(self, unlink=False):
+        # Views on the block must go before the mapping can be closed
+        for field, _, _ in self.FIELDS:
+            setattr(self, field, None)
+        self._size = None
+        self.shm.close()
+        if unlink:
+            self.shm.unlink()